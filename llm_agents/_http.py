@@ -0,0 +1,20 @@
+import httpx
+
+_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=30)
+_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+
+# Keep-alive connection pool shared by every LLM provider client. Reusing pooled connections
+# saves the TCP and TLS handshakes on each API call; HTTP/2 multiplexes concurrent requests
+# to the same provider over one connection.
+SHARED_ASYNC_CLIENT = httpx.AsyncClient(limits=_LIMITS, timeout=_TIMEOUT, http2=True)
+
+# The same pool for the providers' synchronous clients (`generate_response`).
+SHARED_SYNC_CLIENT = httpx.Client(limits=_LIMITS, timeout=_TIMEOUT, http2=True)
+
+
+async def aclose_shared_client() -> None:
+    """
+    Closes the shared connection pools. Call once on application shutdown.
+    """
+    await SHARED_ASYNC_CLIENT.aclose()
+    SHARED_SYNC_CLIENT.close()
@@ -0,0 +1,85 @@
+import logging
+import time
+from typing import Dict, Optional
+
+from .llm_provider import LLMProvider
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised when a provider is skipped because its circuit breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker that stops sending requests to an overloaded provider.
+
+    Once `failure_threshold` consecutive tasks have failed (after the provider's own retries),
+    the breaker opens for `min(max_open_seconds, 2 ** consecutive_failures)` seconds. When that
+    period has elapsed the breaker is half-open: a single probe request is let through while
+    other callers are still skipped. A successful probe closes the breaker; a failed one opens
+    it again for longer. A probe that never reports back is replaced after `probe_timeout` seconds.
+
+    Example:
+        >>> breaker = CircuitBreaker(failure_threshold=2)
+        >>> breaker.record_failure()
+        >>> breaker.is_open()
+        False
+        >>> breaker.record_failure()
+        >>> breaker.is_open()
+        True
+    """
+
+    def __init__(self, failure_threshold: int = 3, max_open_seconds: float = 60.0, probe_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.max_open_seconds = max_open_seconds
+        self.probe_timeout = probe_timeout
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._probe_started: Optional[float] = None
+
+    def is_open(self) -> bool:
+        """
+        Returns True while requests to the provider should be skipped.
+
+        While half-open, the first caller gets False and becomes the probe; everyone else gets
+        True until the probe reports its outcome or times out.
+        """
+        now = time.monotonic()
+        if now < self._open_until:
+            return True
+        if self._consecutive_failures < self.failure_threshold:
+            return False
+        if self._probe_started is not None and now - self._probe_started < self.probe_timeout:
+            return True
+        self._probe_started = now
+        logger.info("Circuit half-open; sending a probe request")
+        return False
+
+    def record_success(self) -> None:
+        """Closes the breaker and resets the failure count."""
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._probe_started = None
+
+    def record_failure(self) -> None:
+        """Counts a failure and opens the breaker once `failure_threshold` is reached."""
+        self._consecutive_failures += 1
+        self._probe_started = None
+        if self._consecutive_failures >= self.failure_threshold:
+            open_for = min(self.max_open_seconds, 2.0 ** self._consecutive_failures)
+            self._open_until = time.monotonic() + open_for
+            logger.warning("Circuit opened for %.0fs after %d consecutive failures", open_for, self._consecutive_failures)
+
+
+_BREAKERS: Dict[LLMProvider, CircuitBreaker] = {provider: CircuitBreaker() for provider in LLMProvider}
+
+
+def breaker_for(provider: LLMProvider) -> CircuitBreaker:
+    """
+    Returns the process-wide circuit breaker of `provider`.
+    """
+    return _BREAKERS[provider]
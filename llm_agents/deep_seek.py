@@ -1,15 +1,20 @@
+import asyncio
 import os
-from typing import Optional
+from typing import AsyncIterator, Optional, Type
 
-from openai import OpenAI
+import httpx
 from dotenv import load_dotenv
-from .llm_provider import BaseLLM, LLMResponse, LLMProvider
+from ._http import SHARED_ASYNC_CLIENT, SHARED_SYNC_CLIENT
+from .llm_cache import ExactLLMCache, SemanticLLMCache
+from .llm_retry import llm_retrying
+from .llm_provider import BaseLLM, LLMResponse, LLMProvider, StructuredModel
 import logging
 
 load_dotenv()
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+
 
 class DeepSeekLLM(BaseLLM):
     """
@@ -20,9 +25,28 @@ class DeepSeekLLM(BaseLLM):
    to connect to the DeepSeek API endpoint.
     """
 
-    def __init__(self, api_key: Optional[str] = None, model: str = "deepseek-reasoner"):
+    def __init__(self, api_key: Optional[str] = None, model: str = "deepseek-reasoner",
+                 cache: Optional[ExactLLMCache] = None, semantic_cache: Optional[SemanticLLMCache] = None,
+                 http_client: httpx.AsyncClient = SHARED_ASYNC_CLIENT,
+                 sync_http_client: httpx.Client = SHARED_SYNC_CLIENT):
         self.model = model
-        self.client = OpenAI(api_key=api_key or os.environ.get("DEEPSEEK_API_KEY"), base_url="https://api.deepseek.com")
+        self.temperature = 0.3
+        self.max_tokens = 1000
+        self.cache = cache
+        self.semantic_cache = semantic_cache
+        self.http_client = http_client
+        # Imported lazily: the OpenAI SDK is only needed once a DeepSeek provider is instantiated.
+        from openai import OpenAI, AsyncOpenAI
+        self.client: "OpenAI" = OpenAI(
+            api_key=api_key or os.environ.get("DEEPSEEK_API_KEY"),
+            base_url=DEEPSEEK_BASE_URL,
+            http_client=sync_http_client
+        )
+        self.aclient: "AsyncOpenAI" = AsyncOpenAI(
+            api_key=api_key or os.environ.get("DEEPSEEK_API_KEY"),
+            base_url=DEEPSEEK_BASE_URL,
+            http_client=http_client
+        )
 
     def generate_response(self, prompt: str, system_prompt: Optional[str] = None) -> LLMResponse:
         """
@@ -31,7 +55,8 @@ class DeepSeekLLM(BaseLLM):
         This method constructs a list of messages for the DeepSeek API (via the OpenAI client),
         including an optional system message and the user's prompt. It then calls the
         `chat.completions.create` method to get a response and encapsulates it within an
-        `LLMResponse` object. Basic error handling is included.
+        `LLMResponse` object. Identical requests are served from the exact-match cache, and
+        near-duplicates from the semantic cache, when configured. Basic error handling is included.
 
         Args:
             prompt (str): The user's input prompt for the LLM.
@@ -50,26 +75,207 @@ class DeepSeekLLM(BaseLLM):
 
             messages.append({"role": "user", "content": prompt})
 
+            cache_key = self.cache.key_for(self.model, messages, self.temperature, self.max_tokens) if self.cache else None
+            cached = self.cache.get(cache_key) if cache_key else None
+            if cached is None and self.semantic_cache:
+                cached = self.semantic_cache.get(self.model, system_prompt, prompt)
+            if cached is not None:
+                return cached
+
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
-                max_tokens=1000,
-                temperature=0.3,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
             )
 
-            return LLMResponse(
+            llm_response = LLMResponse(
                 content=response.choices[0].message.content.strip(),
                 provider=LLMProvider.DEEPSEEK,
                 model=self.model
             )
+            if cache_key:
+                self.cache.set(cache_key, llm_response)
+            if self.semantic_cache:
+                self.semantic_cache.set(self.model, system_prompt, prompt, llm_response)
+            return llm_response
         except Exception as error:
-            logger.error(f"Deep Seeker API error: {error}")
+            logger.error("Deep Seeker API error: %s", error)
             return LLMResponse(
                 content=f"Error generating response: {error}",
                 provider=LLMProvider.DEEPSEEK,
-                model=self.model
+                model=self.model,
+                error=error
+            )
+
+    async def agenerate_response(self, prompt: str, system_prompt: Optional[str] = None) -> LLMResponse:
+        """
+        Asynchronously generates a text response from the DeepSeek LLM.
+
+        Mirrors `generate_response` but awaits the `AsyncOpenAI` client, so the event loop
+        can service other requests while DeepSeek is generating. Transient API errors are
+        retried with exponential backoff before an error response is returned. Concurrent
+        identical requests share a single in-flight API call. Semantic cache lookups and
+        inserts embed the prompt, so they run in a worker thread.
+
+        Args:
+            prompt (str): The user's input prompt for the LLM.
+            system_prompt (Optional[str]): An optional system-level instruction or context
+                                            to guide the LLM's behavior. Defaults to None.
+
+        Returns:
+            LLMResponse: An object containing the generated content, the provider (DEEPSEEK),
+                         and the model used. In case of an error, it will contain an error
+                         message in the content field.
+        """
+        try:
+            messages = []
+            if system_prompt:
+                messages.append({"role": "system", "content": system_prompt})
+
+            messages.append({"role": "user", "content": prompt})
+
+            cache_key = self.cache.key_for(self.model, messages, self.temperature, self.max_tokens) if self.cache else None
+            cached = self.cache.get(cache_key) if cache_key else None
+            if cached is None and self.semantic_cache:
+                cached = await asyncio.to_thread(self.semantic_cache.get, self.model, system_prompt, prompt)
+            if cached is not None:
+                return cached
+
+            async def fetch() -> LLMResponse:
+                async for attempt in llm_retrying(self.is_transient_error):
+                    with attempt:
+                        response = await self.aclient.chat.completions.create(
+                            model=self.model,
+                            messages=messages,
+                            max_tokens=self.max_tokens,
+                            temperature=self.temperature,
+                        )
+
+                llm_response = LLMResponse(
+                    content=response.choices[0].message.content.strip(),
+                    provider=LLMProvider.DEEPSEEK,
+                    model=self.model
+                )
+                if cache_key:
+                    self.cache.set(cache_key, llm_response)
+                if self.semantic_cache:
+                    await asyncio.to_thread(self.semantic_cache.set, self.model, system_prompt, prompt, llm_response)
+                return llm_response
+
+            if self.cache:
+                return await self.cache.coalesce(cache_key, fetch)
+            return await fetch()
+        except Exception as error:
+            logger.error("Deep Seeker API error: %s", error)
+            return LLMResponse(
+                content=f"Error generating response: {error}",
+                provider=LLMProvider.DEEPSEEK,
+                model=self.model,
+                error=error
             )
 
+    async def astream_response(self, prompt: str, system_prompt: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Streams a text response from the DeepSeek LLM using `stream=True`.
+
+        Unlike `agenerate_response`, errors are raised rather than converted into an
+        error `LLMResponse`, since part of the output may already have been consumed.
+        Completed streams are stored in the exact-match cache, and a cache hit is yielded
+        as a single piece.
+
+        Args:
+            prompt (str): The user's input prompt for the LLM.
+            system_prompt (Optional[str]): An optional system-level instruction or context
+                                            to guide the LLM's behavior. Defaults to None.
+
+        Yields:
+            str: Consecutive pieces of the generated text.
+        """
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+
+        messages.append({"role": "user", "content": prompt})
+
+        cache_key = self.cache.key_for(self.model, messages, self.temperature, self.max_tokens) if self.cache else None
+        cached = self.cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            yield cached.content
+            return
+
+        stream = await self.aclient.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            stream=True,
+        )
+        parts = []
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+
+        if cache_key:
+            self.cache.set(cache_key, LLMResponse(
+                content="".join(parts).strip(),
+                provider=LLMProvider.DEEPSEEK,
+                model=self.model
+            ))
+
+    async def agenerate_structured_response(self, prompt: str, schema: Type[StructuredModel],
+                                            system_prompt: Optional[str] = None) -> StructuredModel:
+        """
+        Asynchronously generates a JSON response using DeepSeek's JSON output mode.
+
+        The request sets `response_format={"type": "json_object"}`; the prompt itself must
+        describe the expected keys. The output budget is doubled because a structured
+        response carries several sections.
+
+        Args:
+            prompt (str): The user's input prompt for the LLM.
+            schema (Type[StructuredModel]): The Pydantic model the JSON response is parsed into.
+            system_prompt (Optional[str]): An optional system-level instruction or context
+                                            to guide the LLM's behavior. Defaults to None.
+
+        Returns:
+            StructuredModel: The parsed response.
+
+        Raises:
+            Exception: If the DeepSeek API call fails or the response does not match `schema`.
+        """
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+
+        messages.append({"role": "user", "content": prompt})
+
+        async for attempt in llm_retrying(self.is_transient_error):
+            with attempt:
+                response = await self.aclient.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=2 * self.max_tokens,
+                    temperature=self.temperature,
+                    response_format={"type": "json_object"},
+                )
+        return schema.model_validate_json(response.choices[0].message.content)
+
+    async def warmup(self) -> None:
+        """
+        Establishes a pooled connection to the DeepSeek API.
+        """
+        await self.http_client.head(DEEPSEEK_BASE_URL)
+
+    @staticmethod
+    def is_transient_error(error: BaseException) -> bool:
+        """
+        Returns True for DeepSeek errors worth retrying: rate limits, timeouts, connection errors and 5xx.
+        """
+        import openai
+        return isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError))
+
     def get_provider(self) -> LLMProvider:
         """
         Returns the LLM provider for this instance.
@@ -1,16 +1,20 @@
+import asyncio
 import logging
 import os
 from abc import ABC
-from typing import Optional
+from typing import AsyncIterator, Optional, Type
 from dotenv import load_dotenv
-from google import genai
-from google.genai import types
-from .llm_provider import BaseLLM, LLMResponse, LLMProvider
+import httpx
+from ._http import SHARED_ASYNC_CLIENT, SHARED_SYNC_CLIENT
+from .llm_cache import ExactLLMCache, SemanticLLMCache
+from .llm_retry import llm_retrying
+from .llm_provider import BaseLLM, LLMResponse, LLMProvider, StructuredModel
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 load_dotenv()
 
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com"
+
 
 class GeminiLLM(BaseLLM, ABC):
     """
@@ -21,20 +25,38 @@ class GeminiLLM(BaseLLM, ABC):
     specific to the Gemini API.
     """
 
-    def __init__(self, api_key: Optional[str] = None, model: str = "gemini-2.0-flash"):
+    def __init__(self, api_key: Optional[str] = None, model: str = "gemini-2.0-flash",
+                 temperature: float = 0.3, max_tokens: int = 1000,
+                 cache: Optional[ExactLLMCache] = None, semantic_cache: Optional[SemanticLLMCache] = None,
+                 http_client: httpx.AsyncClient = SHARED_ASYNC_CLIENT,
+                 sync_http_client: httpx.Client = SHARED_SYNC_CLIENT):
         self.api_key = api_key or os.environ.get("GEMINI_API_KEY")
         self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.cache = cache
+        self.semantic_cache = semantic_cache
+        self.http_client = http_client
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY must be set either as an argument or in the environment variables.")
+        # Imported lazily: google-genai pulls in a large dependency tree that is only
+        # needed once a Gemini provider is actually instantiated.
+        from google import genai
+        self._client = genai.Client(
+            api_key=self.api_key,
+            http_options=genai.types.HttpOptions(httpx_client=sync_http_client, httpx_async_client=http_client)
+        )
+        self._types = genai.types
 
     def generate_response(self, prompt: str, system_prompt: Optional[str] = None) -> LLMResponse:
         """
         Generates a text response from the Gemini LLM based on the given prompt and system prompt.
 
-        This method initializes a `google.genai.Client` and then calls the `generate_content`
+        This method uses the `google.genai.Client` created at construction time and calls the `generate_content`
         method with the specified model, configuration (temperature, max output tokens,
         and system instruction), and user content. It wraps the response in an `LLMResponse`
-        object and includes error handling for API failures.
+        object and includes error handling for API failures. Identical requests are served
+        from the exact-match cache, and near-duplicates from the semantic cache, when configured.
 
         Args:
             prompt (str): The user's input prompt for the LLM.
@@ -47,30 +69,186 @@ class GeminiLLM(BaseLLM, ABC):
                          message in the content field.
 
         """
-        client = genai.Client(api_key=self.api_key)
+        cache_key = self._cache_key(prompt, system_prompt)
+        cached = self.cache.get(cache_key) if cache_key else None
+        if cached is None and self.semantic_cache:
+            cached = self._semantic_cache_get(prompt, system_prompt)
+        if cached is not None:
+            return cached
+
         try:
-            response = client.models.generate_content(
+            response = self._client.models.generate_content(
                 model=self.model,
-                config=genai.types.GenerateContentConfig(
-                    temperature=0.3,
-                    max_output_tokens=1000,
+                config=self._types.GenerateContentConfig(
+                    temperature=self.temperature,
+                    max_output_tokens=self.max_tokens,
                     system_instruction=system_prompt
                 ),
                 contents=prompt
             )
-            return LLMResponse(
+            llm_response = LLMResponse(
                 content=response.text.strip(),
                 provider=LLMProvider.GEMINI,
                 model=self.model
             )
+            if cache_key:
+                self.cache.set(cache_key, llm_response)
+            if self.semantic_cache:
+                self.semantic_cache.set(self.model, system_prompt, prompt, llm_response)
+            return llm_response
         except Exception as error:
-            logger.error(f"Gemini API error: {error}")
+            logger.error("Gemini API error: %s", error)
             return LLMResponse(
                 content=f"Error generating response: {error}",
                 provider=LLMProvider.GEMINI,
-                model="gemini-model"
+                model="gemini-model",
+                error=error
             )
 
+    async def agenerate_response(self, prompt: str, system_prompt: Optional[str] = None) -> LLMResponse:
+        """
+        Asynchronously generates a text response from the Gemini LLM.
+
+        Mirrors `generate_response` but goes through the SDK's `aio` namespace, so the
+        request does not block the event loop while Gemini is generating. Overload (503) and
+        rate-limit (429) errors are retried with exponential backoff before an error response
+        is returned. Concurrent identical requests share a single in-flight API call. Semantic
+        cache lookups and inserts embed the prompt, so they run in a worker thread.
+
+        Args:
+            prompt (str): The user's input prompt for the LLM.
+            system_prompt (Optional[str]): An optional system-level instruction or context
+                                           to guide the LLM's behavior. Defaults to None.
+
+        Returns:
+            LLMResponse: An object containing the generated content, the provider (GEMINI),
+                         and the model used. In case of an error, it will contain an error
+                         message in the content field.
+        """
+        cache_key = self._cache_key(prompt, system_prompt)
+        cached = self.cache.get(cache_key) if cache_key else None
+        if cached is None and self.semantic_cache:
+            cached = await asyncio.to_thread(self._semantic_cache_get, prompt, system_prompt)
+        if cached is not None:
+            return cached
+
+        try:
+            async def fetch() -> LLMResponse:
+                async for attempt in llm_retrying(self.is_transient_error):
+                    with attempt:
+                        response = await self._client.aio.models.generate_content(
+                            model=self.model,
+                            config=self._types.GenerateContentConfig(
+                                temperature=self.temperature,
+                                max_output_tokens=self.max_tokens,
+                                system_instruction=system_prompt
+                            ),
+                            contents=prompt
+                        )
+                llm_response = LLMResponse(
+                    content=response.text.strip(),
+                    provider=LLMProvider.GEMINI,
+                    model=self.model
+                )
+                if cache_key:
+                    self.cache.set(cache_key, llm_response)
+                if self.semantic_cache:
+                    await asyncio.to_thread(self.semantic_cache.set, self.model, system_prompt, prompt, llm_response)
+                return llm_response
+
+            if self.cache:
+                return await self.cache.coalesce(cache_key, fetch)
+            return await fetch()
+        except Exception as error:
+            logger.error("Gemini API error: %s", error)
+            return LLMResponse(
+                content=f"Error generating response: {error}",
+                provider=LLMProvider.GEMINI,
+                model="gemini-model",
+                error=error
+            )
+
+    async def astream_response(self, prompt: str, system_prompt: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Streams a text response from the Gemini LLM using `generate_content_stream`.
+
+        Unlike `agenerate_response`, errors are raised rather than converted into an
+        error `LLMResponse`, since part of the output may already have been consumed.
+        Completed streams are stored in the exact-match cache, and a cache hit is yielded
+        as a single piece.
+
+        Args:
+            prompt (str): The user's input prompt for the LLM.
+            system_prompt (Optional[str]): An optional system-level instruction or context
+                                           to guide the LLM's behavior. Defaults to None.
+
+        Yields:
+            str: Consecutive pieces of the generated text.
+        """
+        cache_key = self._cache_key(prompt, system_prompt)
+        cached = self.cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            yield cached.content
+            return
+
+        stream = await self._client.aio.models.generate_content_stream(
+            model=self.model,
+            config=self._types.GenerateContentConfig(
+                temperature=self.temperature,
+                max_output_tokens=self.max_tokens,
+                system_instruction=system_prompt
+            ),
+            contents=prompt
+        )
+        parts = []
+        async for chunk in stream:
+            if chunk.text:
+                parts.append(chunk.text)
+                yield chunk.text
+
+        if cache_key:
+            self.cache.set(cache_key, LLMResponse(
+                content="".join(parts).strip(),
+                provider=LLMProvider.GEMINI,
+                model=self.model
+            ))
+
+    async def agenerate_structured_response(self, prompt: str, schema: Type[StructuredModel],
+                                            system_prompt: Optional[str] = None) -> StructuredModel:
+        """
+        Asynchronously generates a JSON response constrained to `schema` using Gemini's JSON mode.
+
+        The request sets `response_mime_type="application/json"` and passes the Pydantic model as
+        `response_schema`, so Gemini returns an object that parses directly into `schema`. The
+        output budget is doubled because a structured response carries several sections.
+
+        Args:
+            prompt (str): The user's input prompt for the LLM.
+            schema (Type[StructuredModel]): The Pydantic model describing the expected JSON object.
+            system_prompt (Optional[str]): An optional system-level instruction or context
+                                           to guide the LLM's behavior. Defaults to None.
+
+        Returns:
+            StructuredModel: The parsed response.
+
+        Raises:
+            Exception: If the Gemini API call fails or the response does not match `schema`.
+        """
+        async for attempt in llm_retrying(self.is_transient_error):
+            with attempt:
+                response = await self._client.aio.models.generate_content(
+                    model=self.model,
+                    config=self._types.GenerateContentConfig(
+                        temperature=self.temperature,
+                        max_output_tokens=2 * self.max_tokens,
+                        system_instruction=system_prompt,
+                        response_mime_type="application/json",
+                        response_schema=schema
+                    ),
+                    contents=prompt
+                )
+        return schema.model_validate_json(response.text)
+
     def get_provider(self) -> LLMProvider:
         """
        Returns the LLM provider for this instance.
@@ -79,3 +257,41 @@ class GeminiLLM(BaseLLM, ABC):
            LLMProvider: An enum member indicating the LLM provider, which is LLMProvider.GEMINI.
         """
         return LLMProvider.GEMINI
+
+    async def warmup(self) -> None:
+        """
+        Establishes a pooled connection to the Gemini API.
+        """
+        await self.http_client.head(GEMINI_BASE_URL)
+
+    @staticmethod
+    def is_transient_error(error: BaseException) -> bool:
+        """
+        Returns True for Gemini errors worth retrying: 429 resource exhausted, 5xx and transport errors.
+        """
+        from google.genai import errors as genai_errors
+        if isinstance(error, (genai_errors.ServerError, httpx.TransportError)):
+            return True
+        return isinstance(error, genai_errors.ClientError) and error.code == 429
+
+    def _semantic_cache_get(self, prompt: str, system_prompt: Optional[str]) -> Optional[LLMResponse]:
+        """
+        Looks up the semantic cache, treating a failure (e.g. of the embedding model) as a miss.
+        """
+        try:
+            return self.semantic_cache.get(self.model, system_prompt, prompt)
+        except Exception as error:
+            logger.warning("Semantic cache lookup failed: %s", error)
+            return None
+
+    def _cache_key(self, prompt: str, system_prompt: Optional[str]) -> Optional[str]:
+        """
+        Builds the exact-match cache key for a request, or None when no cache is configured.
+        """
+        if not self.cache:
+            return None
+        messages = [
+            {"role": "system", "content": system_prompt or ""},
+            {"role": "user", "content": prompt},
+        ]
+        return self.cache.key_for(self.model, messages, self.temperature, self.max_tokens)
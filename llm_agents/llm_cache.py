@@ -0,0 +1,214 @@
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+from .llm_provider import LLMResponse
+
+logger = logging.getLogger(__name__)
+
+CachedValue = TypeVar("CachedValue")
+
+
+class ExactLLMCache(Generic[CachedValue]):
+    """
+    In-process LRU cache with TTL for LLM responses, keyed on the exact request payload.
+
+    Values are `LLMResponse`s by default, but any immutable value can be stored under a
+    caller-built key, e.g. complete pipeline results keyed on the normalized question.
+
+    The key is a SHA-256 digest of the canonical JSON encoding of the model, messages,
+    temperature and max token budget, so only byte-identical requests share an entry.
+    Entries expire after `ttl` seconds and the least recently used entry is evicted once
+    `maxsize` is reached.
+
+    Concurrent misses for the same key can be coalesced with `coalesce`, so only one
+    upstream request is issued while the others await its result.
+
+    Example:
+        >>> cache = ExactLLMCache(maxsize=256, ttl=600)
+        >>> key = cache.key_for("gemini-2.0-flash", [{"role": "user", "content": "hi"}], 0.0, 1000)
+        >>> cache.get(key) is None
+        True
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0, deterministic_only: bool = False):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.deterministic_only = deterministic_only
+        self._entries: "OrderedDict[str, Tuple[float, CachedValue]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, "asyncio.Task[CachedValue]"] = {}
+
+    def key_for(self, model: str, messages: List[Dict[str, str]], temperature: float,
+                max_tokens: int) -> Optional[str]:
+        """
+        Builds the cache key for a request.
+
+        Args:
+            model (str): The model the request is sent to.
+            messages (List[Dict[str, str]]): The chat messages, including the system message.
+            temperature (float): The sampling temperature of the request.
+            max_tokens (int): The maximum number of output tokens of the request.
+
+        Returns:
+            Optional[str]: The hex digest key, or None if the request should not be cached
+                           (sampling requests when `deterministic_only` is set).
+        """
+        if self.deterministic_only and temperature != 0:
+            return None
+        payload = json.dumps({
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: Optional[str]) -> Optional[CachedValue]:
+        """
+        Returns the cached response for `key`, or None on a miss or expired entry.
+        """
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, response = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        logger.info("LLM cache hit for key %s", key[:12])
+        return response
+
+    def set(self, key: Optional[str], response: CachedValue) -> None:
+        """
+        Stores `response` under `key`, evicting the least recently used entry when full.
+        """
+        if key is None:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    async def coalesce(self, key: Optional[str], fetch: Callable[[], Awaitable[CachedValue]]) -> CachedValue:
+        """
+        Runs `fetch` for `key`, sharing the result with concurrent callers of the same key.
+
+        The first caller for a key starts the request as a task; callers arriving while it is in
+        flight await the same task instead of sending a duplicate request (single-flight). Every
+        caller, the first one included, awaits the task through `asyncio.shield`, so cancelling
+        one caller does not cancel the request for the others.
+
+        Args:
+            key (Optional[str]): The cache key of the request; None disables coalescing.
+            fetch (Callable[[], Awaitable[CachedValue]]): Issues the upstream request.
+
+        Returns:
+            CachedValue: The response of the (possibly shared) request.
+        """
+        if key is None:
+            return await fetch()
+        task = self._inflight.get(key)
+        if task is not None:
+            logger.info("Joining in-flight LLM request for key %s", key[:12])
+        else:
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._finish_inflight, key))
+        return await asyncio.shield(task)
+
+    def _finish_inflight(self, key: str, task: "asyncio.Task[CachedValue]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the outcome as retrieved in case every caller was cancelled before it finished.
+        if not task.cancelled():
+            task.exception()
+
+    def clear(self) -> None:
+        """Removes every entry from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+
+class SemanticLLMCache:
+    """
+    Embedding-similarity cache for LLM responses, consulted after an exact-cache miss.
+
+    Prompts are embedded locally with `sentence-transformers` and compared by cosine
+    similarity against previously answered prompts for the same model and system prompt.
+    A cached response is returned when the best match scores at or above `threshold`,
+    so near-duplicate questions ("symptoms of flu" vs "flu symptoms") skip the LLM call.
+
+    `sentence-transformers` (and its `numpy` dependency) are imported lazily, so the cache
+    is an optional feature that only costs anything when it is enabled.
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", threshold: float = 0.92, maxsize: int = 1024):
+        try:
+            import numpy
+            from sentence_transformers import SentenceTransformer
+        except ImportError as error:
+            raise ImportError("SemanticLLMCache requires the 'sentence-transformers' package.") from error
+
+        self._np = numpy
+        self._encoder = SentenceTransformer(model_name)
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self._namespaces: Dict[str, Tuple[list, List[LLMResponse]]] = {}
+        self._lock = threading.Lock()
+        self._embed = functools.lru_cache(maxsize=256)(self._encode)
+
+    def _encode(self, text: str):
+        return self._encoder.encode(text, normalize_embeddings=True)
+
+    @staticmethod
+    def _namespace(model: str, system_prompt: Optional[str]) -> str:
+        return hashlib.sha256(f"{model}\x00{system_prompt or ''}".encode()).hexdigest()
+
+    def get(self, model: str, system_prompt: Optional[str], prompt: str) -> Optional[LLMResponse]:
+        """
+        Returns the cached response of the most similar earlier prompt, if it is similar enough.
+
+        Args:
+            model (str): The model the request is sent to.
+            system_prompt (Optional[str]): The system prompt of the request.
+            prompt (str): The user prompt of the request.
+
+        Returns:
+            Optional[LLMResponse]: The cached response, or None when no earlier prompt scores
+                                   at or above the similarity threshold.
+        """
+        with self._lock:
+            entry = self._namespaces.get(self._namespace(model, system_prompt))
+            if not entry or not entry[0]:
+                return None
+            embeddings, responses = entry[0][:], entry[1][:]
+        scores = self._np.stack(embeddings) @ self._embed(prompt)
+        best = int(scores.argmax())
+        if scores[best] < self.threshold:
+            return None
+        logger.info("Semantic LLM cache hit (similarity %.3f)", scores[best])
+        return responses[best]
+
+    def set(self, model: str, system_prompt: Optional[str], prompt: str, response: LLMResponse) -> None:
+        """
+        Stores `response` for `prompt`, dropping the oldest entry of the namespace when full.
+        """
+        embedding = self._embed(prompt)
+        with self._lock:
+            embeddings, responses = self._namespaces.setdefault(self._namespace(model, system_prompt), ([], []))
+            embeddings.append(embedding)
+            responses.append(response)
+            if len(embeddings) > self.maxsize:
+                del embeddings[0]
+                del responses[0]
@@ -1,13 +1,33 @@
+import asyncio
 from enum import Enum
-from typing import Optional
+from typing import Callable, Dict, Optional, Type
 
 from pydantic import BaseModel
-from .llm_provider import BaseLLM, LLMResponse
+from .circuit_breaker import CircuitOpenError, breaker_for
+from .llm_provider import BaseLLM, LLMProvider, LLMResponse, StructuredModel
 import logging
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Maximum number of in-flight calls per provider, shared by all agents in the process.
+PROVIDER_MAX_CONCURRENCY = 20
+
+_PROVIDER_SEMAPHORES: Dict[LLMProvider, asyncio.Semaphore] = {
+    provider: asyncio.Semaphore(PROVIDER_MAX_CONCURRENCY) for provider in LLMProvider
+}
+
+
+def _record_error(llm: BaseLLM, error: BaseException) -> None:
+    """
+    Reports a failed call to the circuit breaker of `llm`'s provider.
+
+    Only errors the provider classifies as transient (rate limits, timeouts, connection errors
+    and 5xx) count as failures. Any other error, such as a rejected request, says nothing about
+    the provider's availability and leaves the breaker as it is.
+    """
+    if llm.is_transient_error(error):
+        breaker_for(llm.get_provider()).record_failure()
+
 
 class LLMTask(BaseModel):
     """
@@ -78,13 +98,34 @@ class MedicalLLMController:
     This controller class manages the interaction with an LLM instance to fulfill
     defined tasks. It applies role-specific system prompts and integrates
     external search context into the LLM's prompt when provided.
+
+    Transient API failures open the provider's circuit breaker; while it is open, tasks are rerouted
+    to `fallback_llm` (if any) instead of queueing more requests on an overloaded provider.
+    At most `PROVIDER_MAX_CONCURRENCY` calls per provider are in flight at any time.
     """
-    def __init__(self, role: LLMRole, llm: BaseLLM):
+    def __init__(self, role: LLMRole, llm: BaseLLM, fallback_llm: Optional[BaseLLM] = None):
         self.role = role
         self.llm = llm
+        self.fallback_llm = fallback_llm
         self.system_prompts = _get_system_prompts()
 
-    async def execute_task(self, task: LLMTask, search_context: Optional[str] = None) -> LLMResponse:
+    def _select_llm(self) -> BaseLLM:
+        """
+        Returns the primary LLM, or the fallback LLM while the primary provider's circuit is open.
+
+        Raises:
+            CircuitOpenError: If the circuits of both the primary and the fallback provider are open.
+        """
+        if not breaker_for(self.llm.get_provider()).is_open():
+            return self.llm
+        if self.fallback_llm and not breaker_for(self.fallback_llm.get_provider()).is_open():
+            logger.warning("Circuit open for %s; routing %s task to %s", self.llm.get_provider().value,
+                           self.role.value, self.fallback_llm.get_provider().value)
+            return self.fallback_llm
+        raise CircuitOpenError(f"LLM provider {self.llm.get_provider().value} is overloaded")
+
+    async def execute_task(self, task: LLMTask, search_context: Optional[str] = None,
+                           on_token: Optional[Callable[[str], None]] = None) -> LLMResponse:
         """
         Executes a given LLM task, incorporating search context if provided.
 
@@ -95,26 +136,77 @@ class MedicalLLMController:
         Args:
             task (LLMTask): The task to execute, containing the core prompt and flags.
             search_context (Optional[str]): Optional search results context to include in the prompt.
+            on_token (Optional[Callable[[str], None]]): Optional callback invoked with each text
+                delta as it arrives. When given, the response is streamed from the LLM.
 
         Returns:
             LLMResponse: The response generated by the LLM, encapsulated with content,
                          provider, and model information.
+
+        Raises:
+            CircuitOpenError: If the provider (and the fallback, if any) is currently overloaded.
+            RuntimeError: If the LLM returned an error response.
         """
-        search_info = ""
-        full_prompt = task.prompt
-        if search_context:
-            search_info = f"\n\nSearch Results Context:\n{search_context}"
-        full_prompt += search_info
+        full_prompt = f"{task.prompt}\n\nSearch Results Context:\n{search_context}" if search_context else task.prompt
 
         system_prompt = task.system_prompt or self.system_prompts.get(self.role, "")
-        response = self.llm.generate_response(full_prompt, system_prompt)
-        logger.info(f"Agent {self.role.value} ({self.llm.get_provider().value}) completed task: {task.task_id}")
+        llm = self._select_llm()
+        try:
+            async with _PROVIDER_SEMAPHORES[llm.get_provider()]:
+                if on_token is None:
+                    response = await llm.agenerate_response(full_prompt, system_prompt)
+                else:
+                    parts = []
+                    async for delta in llm.astream_response(full_prompt, system_prompt):
+                        parts.append(delta)
+                        on_token(delta)
+                    response = LLMResponse(
+                        content="".join(parts).strip(),
+                        provider=llm.get_provider(),
+                        model=llm.model
+                    )
+        except Exception as error:
+            _record_error(llm, error)
+            raise
+
+        # Providers report API failures as an error response rather than raising.
+        if response.error is not None:
+            _record_error(llm, response.error)
+            raise RuntimeError(f"LLM error: {response.content}") from response.error
+
+        breaker_for(llm.get_provider()).record_success()
+        logger.info("Agent %s (%s) completed task: %s", self.role.value, llm.get_provider().value, task.task_id)
+        return response
+
+    async def execute_structured_task(self, task: LLMTask, schema: Type[StructuredModel]) -> StructuredModel:
+        """
+        Executes a given LLM task whose answer is a JSON object described by `schema`.
+
+        This is used for merged multi-stage tasks, where a single call returns the output
+        of several pipeline stages as separate fields.
 
-        # Raise an exception if the response contains an error pattern
-        if (
-                isinstance(response.content, str)
-                and ("error" in response.content.lower() or "503" in response.content)
-        ):
-            raise RuntimeError(f"LLM error: {response.content}")
+        Args:
+            task (LLMTask): The task to execute. Its prompt should describe the expected JSON object.
+            schema (Type[StructuredModel]): The Pydantic model the response is parsed into.
 
+        Returns:
+            StructuredModel: The parsed response of the LLM.
+
+        Like `execute_task`, the task is rerouted to the fallback LLM while the primary
+        provider's circuit is open, and transient API errors count against the breaker.
+
+        Raises:
+            CircuitOpenError: If the provider (and the fallback, if any) is currently overloaded.
+            Exception: If the LLM call fails or the response does not match `schema`.
+        """
+        system_prompt = task.system_prompt or self.system_prompts.get(self.role, "")
+        llm = self._select_llm()
+        try:
+            async with _PROVIDER_SEMAPHORES[llm.get_provider()]:
+                response = await llm.agenerate_structured_response(task.prompt, schema, system_prompt)
+        except Exception as error:
+            _record_error(llm, error)
+            raise
+        breaker_for(llm.get_provider()).record_success()
+        logger.info("Agent %s (%s) completed task: %s", self.role.value, llm.get_provider().value, task.task_id)
         return response
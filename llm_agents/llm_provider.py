@@ -1,19 +1,33 @@
+import asyncio
 from abc import abstractmethod, ABC
+from dataclasses import dataclass
 from enum import Enum
-from typing import Optional
+from typing import AsyncIterator, Optional, Type, TypeVar
 
 from pydantic import BaseModel
 
+StructuredModel = TypeVar("StructuredModel", bound=BaseModel)
+
 
 class LLMProvider(Enum):
-    OPENAI = "openai"
     GEMINI = "gemini"
     DEEPSEEK = "deepseek"
+    # Output produced by local post-processing instead of an LLM call.
+    LOCAL = "local"
+
+@dataclass(slots=True, frozen=True)
+class LLMResponse:
+    """
+    Immutable result of a single LLM call.
 
-class LLMResponse(BaseModel):
+    Instances are only ever built from our own provider code, so this is a plain slotted
+    dataclass rather than a Pydantic model: construction skips validation entirely.
+    """
     content: str
     provider: LLMProvider
     model: str
+    # The exception behind an error response; None for a generated answer.
+    error: Optional[BaseException] = None
 
 
 class BaseLLM(ABC):
@@ -36,6 +50,92 @@ class BaseLLM(ABC):
         """
         pass
 
+    async def agenerate_response(self, prompt: str, system_prompt: Optional[str] = None) -> LLMResponse:
+        """
+        Asynchronously generate a response from the LLM based on the provided prompt.
+
+        Providers with a native async client should override this method. The default
+        implementation runs the blocking `generate_response` in a worker thread so the
+        event loop is never stalled by network I/O.
+
+        Args:
+            prompt (str): The input prompt for the LLM.
+            system_prompt (Optional[str]): An optional system-level instruction or context
+                                            to guide the LLM's behavior.
+
+        Returns:
+            LLMResponse: The generated response from the LLM.
+        """
+        return await asyncio.to_thread(self.generate_response, prompt, system_prompt)
+
+    async def astream_response(self, prompt: str, system_prompt: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Asynchronously stream a response from the LLM as text deltas.
+
+        Providers with a streaming API should override this method. The default
+        implementation yields the complete `agenerate_response` content as a single delta.
+
+        Args:
+            prompt (str): The input prompt for the LLM.
+            system_prompt (Optional[str]): An optional system-level instruction or context
+                                            to guide the LLM's behavior.
+
+        Yields:
+            str: Consecutive pieces of the generated text.
+        """
+        response = await self.agenerate_response(prompt, system_prompt)
+        if response.error is not None:
+            raise response.error
+        yield response.content
+
+    async def agenerate_structured_response(self, prompt: str, schema: Type[StructuredModel],
+                                            system_prompt: Optional[str] = None) -> StructuredModel:
+        """
+        Asynchronously generate a JSON response from the LLM and parse it into `schema`.
+
+        Providers with a native JSON output mode should override this method. The default
+        implementation asks for a plain response and parses it, tolerating a surrounding
+        markdown code fence.
+
+        Args:
+            prompt (str): The input prompt for the LLM. It should describe the expected JSON object.
+            schema (Type[StructuredModel]): The Pydantic model the JSON response is parsed into.
+            system_prompt (Optional[str]): An optional system-level instruction or context
+                                            to guide the LLM's behavior.
+
+        Returns:
+            StructuredModel: The parsed response.
+
+        Raises:
+            pydantic.ValidationError: If the response is not valid JSON for `schema`.
+        """
+        response = await self.agenerate_response(prompt, system_prompt)
+        if response.error is not None:
+            raise response.error
+        content = response.content.strip()
+        if content.startswith("```"):
+            content = content.split("\n", 1)[-1].rsplit("```", 1)[0]
+        return schema.model_validate_json(content)
+
+    @staticmethod
+    def is_transient_error(error: BaseException) -> bool:
+        """
+        Returns True for errors that mean the provider is unavailable or overloaded.
+
+        Providers override this to classify their SDK's rate-limit, timeout, connection and 5xx
+        errors. The default treats every error as permanent.
+        """
+        return False
+
+    async def warmup(self) -> None:
+        """
+        Opens a connection to the provider ahead of the first request.
+
+        Providers that use the shared HTTP connection pool override this to pay the TCP and
+        TLS handshake at startup instead of on the first user request. The default does nothing.
+        """
+        return None
+
     @abstractmethod
     def get_provider(self) -> LLMProvider:
         """
@@ -0,0 +1,65 @@
+import functools
+import logging
+from typing import Callable, Optional
+
+from tenacity import AsyncRetrying, RetryCallState, retry_if_exception, stop_after_attempt, wait_random_exponential
+from tenacity.wait import wait_base
+
+logger = logging.getLogger(__name__)
+
+
+def _retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    Returns the delay requested by the provider's `Retry-After` header, if the error carries one.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _wait(backoff: wait_base, retry_state: RetryCallState) -> float:
+    """
+    Honors `Retry-After` when present (capped at 30s), otherwise uses `backoff`.
+    """
+    error = retry_state.outcome.exception() if retry_state.outcome else None
+    retry_after = _retry_after_seconds(error) if error else None
+    delay = min(retry_after, 30.0) if retry_after is not None else backoff(retry_state)
+    logger.warning("Transient error (%s); retrying in %.1fs (attempt %d)", error, delay, retry_state.attempt_number)
+    return delay
+
+
+def llm_retrying(is_transient: Callable[[BaseException], bool], attempts: int = 5,
+                 min_wait: float = 1, max_wait: float = 30) -> AsyncRetrying:
+    """
+    Builds the retry policy used around provider API calls.
+
+    Only errors for which `is_transient` returns True (rate limits, timeouts, connection
+    failures, 5xx) are retried; anything else, such as a 4xx caused by a bad request,
+    is raised immediately. The last error is re-raised once `attempts` is exhausted.
+    The search helpers reuse it with their own predicate and shorter waits.
+
+    Args:
+        is_transient (Callable[[BaseException], bool]): Predicate selecting retryable errors.
+        attempts (int): Maximum number of attempts, including the first one (default: 5).
+        min_wait (float): Lower bound of the randomized exponential backoff, in seconds.
+        max_wait (float): Upper bound of the randomized exponential backoff, in seconds.
+
+    Returns:
+        AsyncRetrying: A tenacity controller to iterate with `async for attempt in ...`.
+
+    Example:
+        >>> async for attempt in llm_retrying(is_transient):
+        ...     with attempt:
+        ...         response = await client.call()
+    """
+    return AsyncRetrying(
+        retry=retry_if_exception(is_transient),
+        wait=functools.partial(_wait, wait_random_exponential(min=min_wait, max=max_wait)),
+        stop=stop_after_attempt(attempts),
+        reraise=True,
+    )
@@ -1,20 +1,286 @@
-from typing import Dict, Optional
-from datetime import datetime
+import asyncio
+import functools
+import html
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from markupsafe import Markup
 from pydantic import BaseModel
 
 from utils.html_template_generator import HTMLResponseGenerator
 from .llm_controller import MedicalLLMController, LLMRole, LLMTask
+from .llm_provider import BaseLLM, LLMProvider, LLMResponse
 from .gemini import GeminiLLM
 from .deep_seek import DeepSeekLLM
+from ._http import SHARED_ASYNC_CLIENT
+from .llm_cache import ExactLLMCache, SemanticLLMCache
+from .task_dag import TaskDAG, TaskNode
 import logging
 
-from .openai import OpenAILLM
-
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 generator = HTMLResponseGenerator()
-class AgentResponse(BaseModel):
+
+# The empty answer template the validator fills in; it does not depend on the question.
+_HTML_WRAPPER = generator.generate_html()
+
+# Maximum number of refined queries remembered by `MultiLLMController.refine_initial_query`.
+REFINED_QUERY_CACHE_SIZE = 1024
+
+# Provider labels used when building result objects, precomputed to skip Enum `.value` lookups.
+_PROVIDER_STR: Dict[LLMProvider, str] = {provider: provider.value for provider in LLMProvider}
+
+# Static prompt prefixes. They are byte-identical across questions and come before any
+# per-question content, so providers with prefix (KV) caching can reuse them server-side.
+RESEARCH_PROMPT_PREFIX = """Analyze the medical question in the Input section using the comprehensive search information provided from multiple sources.
+
+You have a strict limit of approximately **1000 tokens** for the final output. Adjust detail level, brevity, and formatting accordingly to fit this constraint.
+
+RESEARCH INSTRUCTIONS:
+Based on the search results from both web sources and medical literature (if available), extract and synthesize the most relevant and reliable medical information.
+
+Prioritize information in this order:
+1. Peer-reviewed medical literature (PubMed results)
+2. Reputable medical sources (Mayo Clinic, WebMD, NIH, medical journals)
+3. Other credible health websites
+
+Focus on identifying key points about:
+- Symptoms or conditions mentioned
+- Potential causes and risk factors
+- Treatment options and management strategies
+- When to seek medical care
+- Prevention measures (if applicable)
+
+IMPORTANT GUIDELINES:
+- Cross-reference information between web and literature sources when possible
+- If sources contradict each other, mention this and favor peer-reviewed literature
+- If search results are inconclusive, contradictory, or if information on a particular key point is scarce, state this clearly
+- Do not invent information or make assumptions beyond what the sources provide
+- If the question is outside the scope of general medical knowledge, state that appropriately
+- Emphasize that this information is for educational purposes only
+
+Synthesize the information from both sources into a coherent, evidence-based response."""
+
+VALIDATION_PROMPT_PREFIX = """You are validating a medical response to ensure it meets safety and quality standards before presenting it to users.
+
+You have a strict limit of approximately **1000 tokens** for the final output. Adjust the level of detail, brevity, and formatting accordingly to fit within this limit.
+
+The draft response, based on web search and literature review, is given in the Input section.
+
+REQUIREMENTS:
+1. Format your final output using HTML only — no markdown or explanations.
+2. Use Tailwind CSS classes and structure your content freely as appropriate for the question.
+3. Wrap your output with this exact template (do NOT change structure or classes):
+
+{html_wrapper}
+
+4. Replace {{YOUR_BODY_HTML_HERE}} with your validated content using valid HTML elements.
+5. Ensure the disclaimers remain exactly as shown at the top and bottom.
+
+Return only the final rendered HTML."""
+
+COMBINED_PROMPT_SUFFIX = """
+
+Respond with a JSON object with exactly two string fields:
+- "research": your synthesized, evidence-based research response.
+- "validation": the research response validated for safety and accuracy, following the VALIDATION REQUIREMENTS below.
+
+VALIDATION ROLE:
+{validator_role}
+
+VALIDATION REQUIREMENTS:
+1. Format the validation field using HTML only — no markdown or explanations.
+2. Use Tailwind CSS classes and structure your content freely as appropriate for the question.
+3. Wrap the validation field with this exact template (do NOT change structure or classes):
+
+{html_wrapper}
+
+4. Replace {{YOUR_BODY_HTML_HERE}} with your validated content using valid HTML elements.
+5. Ensure the disclaimers remain exactly as shown at the top and bottom."""
+
+
+REFINE_PROMPT_TEMPLATE = "Original medical query: '{query}'\n\nRefined medical query for search engine:"
+
+RESEARCH_INPUT_TEMPLATE = "Original Question: {question}\n{web_block}{pubmed_block}"
+
+WEB_RESULTS_TEMPLATE = "\nWEB SEARCH RESULTS:\n{web_search_results}\n"
+
+PUBMED_RESULTS_TEMPLATE = "\nPUBMED LITERATURE RESULTS:\n{pubmed_results}\n"
+
+
+_HTML_FENCE_RE = re.compile(r"^```(?:html|markdown)?\s*$", re.MULTILINE)
+_HEADING_RE = re.compile(r"^(?:#{1,6}\s+(?P<hash>.+?)|\*\*(?P<bold>[^*]+?)\*\*:?)\s*$")
+_BULLET_RE = re.compile(r"^(?:[-*•]|\d+[.)])\s+(?P<item>.+)$")
+_INLINE_BOLD_RE = re.compile(r"\*\*(.+?)\*\*")
+
+# With LLM_SKIP_VALIDATOR=true, research text containing any of these phrases still goes through
+# the LLM validator. They catch the researcher diagnosing the reader ("i diagnose", "your
+# diagnosis") or prescribing to them ("you should take"): individual medical advice, which the
+# validator is instructed to remove. General second-person phrasing such as "if you have
+# diabetes" is normal in consumer health answers and is deliberately not listed.
+_UNSAFE_RESEARCH_PHRASES = ("i diagnose", "you should take", "your diagnosis")
+
+
+# Exact-match response cache shared by every provider instance in the process. Only
+# temperature-0 requests (the query refiner) are cached unless `LLM_CACHE_NONDETERMINISTIC=true`:
+# research and validation sample at a non-zero temperature, and would otherwise replay one
+# sample for the whole TTL.
+_RESPONSE_CACHE = ExactLLMCache(deterministic_only=os.environ.get("LLM_CACHE_NONDETERMINISTIC") != "true")
+
+
+@functools.cache
+def _get_semantic_cache() -> Optional[SemanticLLMCache]:
+    """
+    Returns the process-wide semantic response cache, or None unless `LLM_SEMANTIC_CACHE=true`.
+
+    Only the query refiner uses it. Near-identical medical questions can still need different
+    answers ("dose of X for children" vs "for adults"), so research and validation responses
+    are never served by similarity.
+    """
+    return SemanticLLMCache() if os.environ.get("LLM_SEMANTIC_CACHE") == "true" else None
+
+
+# Generation settings of the query refiner: its output is a short search query, so a small
+# token budget returns sooner and temperature 0 keeps repeated refinements identical.
+REFINER_TEMPERATURE = 0.0
+REFINER_MAX_OUTPUT_TOKENS = 64
+
+
+@functools.cache
+def _get_llm(name: str) -> BaseLLM:
+    """
+    Returns the process-wide LLM instance of a provider, creating it on first use.
+
+    Args:
+        name (str): The provider name, "gemini" or "deepseek", or "gemini-refiner" for the
+            Gemini instance configured for query refinement.
+
+    Returns:
+        BaseLLM: The shared provider instance.
+
+    Raises:
+        ValueError: If `name` is not a known provider.
+    """
+    if name == "gemini":
+        return GeminiLLM(cache=_RESPONSE_CACHE, http_client=SHARED_ASYNC_CLIENT)
+    if name == "gemini-refiner":
+        return GeminiLLM(temperature=REFINER_TEMPERATURE, max_tokens=REFINER_MAX_OUTPUT_TOKENS,
+                         cache=_RESPONSE_CACHE, semantic_cache=_get_semantic_cache(), http_client=SHARED_ASYNC_CLIENT)
+    if name == "deepseek":
+        return DeepSeekLLM(cache=_RESPONSE_CACHE, http_client=SHARED_ASYNC_CLIENT)
+    raise ValueError(f"Unknown LLM provider: {name}")
+
+
+def _inline_html(text: str) -> Markup:
+    """
+    Escapes `text` for HTML and turns markdown `**bold**` into `<strong>`.
+
+    The result is marked safe so `HTMLResponseGenerator` does not escape it a second time.
+    """
+    return Markup(_INLINE_BOLD_RE.sub(r"<strong>\1</strong>", html.escape(text)))
+
+
+def _render_html(research_text: str) -> str:
+    """
+    Deterministically renders markdown-ish research output into the validator's HTML template.
+
+    Headings (`## Title` or a line of `**Title**`) start a new section; every other line,
+    with any bullet or number marker removed, becomes an item of that section. The disclaimers are
+    added by `HTMLResponseGenerator`, exactly as the LLM validator is instructed to.
+
+    Args:
+        research_text (str): The RESEARCHER agent's output.
+
+    Returns:
+        str: The final HTML answer.
+    """
+    sections: Dict[str, list] = {}
+    title = Markup("Overview")
+    for raw_line in _HTML_FENCE_RE.sub("", research_text).splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        heading = _HEADING_RE.match(line)
+        if heading:
+            title = _inline_html((heading.group("hash") or heading.group("bold")).rstrip(":"))
+            continue
+        bullet = _BULLET_RE.match(line)
+        sections.setdefault(title, []).append(_inline_html(bullet.group("item") if bullet else line))
+
+    renderer = HTMLResponseGenerator()
+    renderer.set_data(sections)
+    return renderer.generate_html()
+
+
+def _requires_llm_validation(research_text: str) -> bool:
+    """
+    Returns True when the research text contains phrasing that only the LLM validator may rewrite.
+
+    See `_UNSAFE_RESEARCH_PHRASES` for what is matched and why.
+    """
+    lowered = research_text.lower()
+    return any(phrase in lowered for phrase in _UNSAFE_RESEARCH_PHRASES)
+
+
+# Maximum number of input tokens spent on each search source in the research prompt.
+SEARCH_RESULTS_TOKEN_BUDGET = 1500
+
+# Rough characters-per-token ratio of English text, used to estimate token counts without a tokenizer.
+_CHARS_PER_TOKEN = 4
+
+# Search payloads larger than this (in characters) are assembled off the event loop.
+_OFFLOAD_THRESHOLD = 100_000
+
+
+def _trim_to_tokens(text: Optional[str], max_tokens: int = SEARCH_RESULTS_TOKEN_BUDGET) -> Optional[str]:
+    """
+    Cuts `text` down to roughly `max_tokens` tokens, preferring to cut at a line break.
+
+    The token count is estimated from the character count, which is accurate enough to bound
+    the prompt size for every provider without loading a provider-specific tokenizer.
+
+    Args:
+        text (Optional[str]): The text to trim.
+        max_tokens (int): The approximate token budget (default: SEARCH_RESULTS_TOKEN_BUDGET).
+
+    Returns:
+        Optional[str]: The text itself if it fits the budget, otherwise its trimmed prefix.
+    """
+    max_chars = max_tokens * _CHARS_PER_TOKEN
+    if not text or len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n", 0, max_chars)
+    return text[:cut if cut > max_chars // 2 else max_chars] + "\n[truncated]"
+
+
+def _build_research_input(question: str, web_search_results: Optional[str], pubmed_results: Optional[str]) -> str:
+    """
+    Builds the per-question research input from the question and the available search results.
+
+    Each search source is trimmed to `SEARCH_RESULTS_TOKEN_BUDGET` tokens first, since input
+    size drives both the cost and the latency of the research call.
+    """
+    web_search_results = _trim_to_tokens(web_search_results)
+    pubmed_results = _trim_to_tokens(pubmed_results)
+    return RESEARCH_INPUT_TEMPLATE.format_map({
+        "question": question,
+        "web_block": WEB_RESULTS_TEMPLATE.format(web_search_results=web_search_results) if web_search_results else "",
+        "pubmed_block": PUBMED_RESULTS_TEMPLATE.format(pubmed_results=pubmed_results) if pubmed_results else "",
+    })
+
+
+def _with_input(prefix: str, dynamic_input: str) -> str:
+    """
+    Appends the per-question payload after a static prompt prefix.
+    """
+    return f"{prefix}\n\n---\nInput:\n{dynamic_input}\n---\nRespond now."
+
+
+@dataclass(slots=True, frozen=True)
+class AgentResponse:
     """
     Represents a standardized response from an individual LLM agent.
     """
@@ -23,7 +289,14 @@ class AgentResponse(BaseModel):
     model: str
 
 
-class AgentResponses(BaseModel):
+OVERLOADED_MESSAGE = "The model is currently overloaded due to a high volume of requests. Please try again during off peak hours."
+
+# Stage response used when the pipeline fails; immutable, so a single instance is shared.
+_OVERLOADED_RESPONSE = AgentResponse(content=OVERLOADED_MESSAGE, provider="N/A", model="N/A")
+
+
+@dataclass(slots=True, frozen=True)
+class AgentResponses:
     """
     Gathers responses from different LLM agents involved in processing a question.
     """
@@ -32,18 +305,30 @@ class AgentResponses(BaseModel):
     validation: AgentResponse
 
 
-class AgentResult(BaseModel):
+@dataclass(slots=True, frozen=True)
+class AgentResult:
     """
     Encapsulates the complete result of processing a medical question.
+
+    The result types are plain slotted dataclasses: they are only built from trusted internal
+    values, so per-field validation is skipped. FastAPI still serializes them as JSON.
     """
     question: str
-    web_search_results: Optional[str] = None
-    pubmed_results: Optional[str] = None
+    web_search_results: Optional[str]
+    pubmed_results: Optional[str]
     agent_responses: AgentResponses
     final_answer: str
     timestamp: datetime
 
 
+class CombinedStagesResponse(BaseModel):
+    """
+    Structured output of the merged research + validation call.
+    """
+    research: str
+    validation: str
+
+
 class MultiLLMController:
     """
     Orchestrates a multi-stage process for answering medical questions using different LLM agents.
@@ -55,34 +340,75 @@ class MultiLLMController:
 
     def __init__(self):
         self.agents: Dict[LLMRole, MedicalLLMController] = {}
+        self.cache = _RESPONSE_CACHE
+        self.combine_stages = os.environ.get("LLM_COMBINED_STAGES") == "true"
+        self.skip_validator_llm = os.environ.get("LLM_SKIP_VALIDATOR") == "true"
+        self._refined_queries: "OrderedDict[str, AgentResponse]" = OrderedDict()
         self.setup_agents()
+        self.dag = TaskDAG(self.agents)
 
     def setup_agents(self):
         """
         Configures and initializes the LLM agents for each role.
 
-        It attempts to set up agents with specific LLM providers (Gemini, DeepSeek, OpenAI).
+        It attempts to set up agents with specific LLM providers (Gemini, DeepSeek).
         In case of an error during initialization of any specific LLM, it falls back to
-        using GeminiLLM for all roles to ensure the system remains operational.
+        using GeminiLLM for all roles to ensure the system remains operational. The researcher
+        and validator are rerouted to DeepSeek while Gemini's circuit breaker is open. Provider
+        instances come from `_get_llm`, so they are created once per process and shared by every
+        controller, together with the exact-match response cache and one keep-alive HTTP connection
+        pool; the query refiner also gets the semantic cache when `LLM_SEMANTIC_CACHE=true`.
+
+        Raises:
+            ImportError: If `LLM_SEMANTIC_CACHE=true` but `sentence-transformers` is not installed.
         """
+        # Built before the fallback below, so a misconfigured semantic cache fails startup
+        # instead of silently putting every role on Gemini alone.
+        _get_semantic_cache()
         try:
-            gemini_llm = GeminiLLM()
-            deep_seek_llm = DeepSeekLLM()
-            open_ai_llm = OpenAILLM()
+            gemini_llm = _get_llm("gemini")
+            deep_seek_llm = _get_llm("deepseek")
             self.agents = {
-                LLMRole.QUERY_REFINER: MedicalLLMController(LLMRole.QUERY_REFINER, gemini_llm),
-                LLMRole.RESEARCHER: MedicalLLMController(LLMRole.RESEARCHER, gemini_llm),
-                LLMRole.VALIDATOR: MedicalLLMController(LLMRole.VALIDATOR, gemini_llm)
+                LLMRole.QUERY_REFINER: MedicalLLMController(LLMRole.QUERY_REFINER, _get_llm("gemini-refiner")),
+                LLMRole.RESEARCHER: MedicalLLMController(LLMRole.RESEARCHER, gemini_llm, fallback_llm=deep_seek_llm),
+                LLMRole.VALIDATOR: MedicalLLMController(LLMRole.VALIDATOR, gemini_llm, fallback_llm=deep_seek_llm)
             }
             logger.info("Multi-LLM agent system initialized successfully")
         except Exception as error:
-            logger.error(f"Error initializing Multi-LLM agents: {error}")
-            fallback_llm = GeminiLLM()
+            logger.error("Error initializing Multi-LLM agents: %s", error)
+            fallback_llm = _get_llm("gemini")
             self.agents = {
                 role: MedicalLLMController(role, fallback_llm)
                 for role in LLMRole
             }
+        # System prompt of each role, resolved once instead of per task.
+        self._system_prompts: Dict[LLMRole, str] = {
+            role: agent.system_prompts[role] for role, agent in self.agents.items()
+        }
+        # Static prefix of the merged research + validation prompt, rendered once.
+        self._combined_prefix = "".join((
+            RESEARCH_PROMPT_PREFIX,
+            COMBINED_PROMPT_SUFFIX.format(validator_role=self._system_prompts[LLMRole.VALIDATOR], html_wrapper=_HTML_WRAPPER),
+        ))
+        # Provider label and model of each role; they never change after setup.
+        self._agent_meta: Dict[LLMRole, Tuple[str, str]] = {
+            role: (_PROVIDER_STR[agent.llm.get_provider()], agent.llm.model)
+            for role, agent in self.agents.items()
+        }
+
+    async def warmup(self) -> None:
+        """
+        Opens connections to every configured LLM provider concurrently.
 
+        Called once at application startup so the first question does not pay the TCP and
+        TLS handshakes of each provider. Failures are logged and otherwise ignored.
+        """
+        # One request per provider: instances of the same provider share the connection pool.
+        llms = list({agent.llm.get_provider(): agent.llm for agent in self.agents.values()}.values())
+        results = await asyncio.gather(*(llm.warmup() for llm in llms), return_exceptions=True)
+        for llm, result in zip(llms, results):
+            if isinstance(result, Exception):
+                logger.warning("Warm-up of %s failed: %s", llm.get_provider().value, result)
 
     async def refine_initial_query(self, query: str) -> AgentResponse:
         """
@@ -91,6 +417,8 @@ class MultiLLMController:
         This method sends the original user question to the QUERY_REFINER LLM agent,
         which is tasked with transforming it into a precise and effective search query.
         It includes basic post-processing to remove potential surrounding quotes from the LLM's output.
+        Successful refinements are memoized in an LRU keyed on the lower-cased, whitespace-normalized
+        question, so repeated questions skip the LLM round-trip; fallbacks are not cached.
 
         Args:
             query (str): The original user's medical question.
@@ -99,10 +427,17 @@ class MultiLLMController:
             str: A refined search query string. If the refinement fails or returns
                  an empty response, the original query is returned as a fallback.
         """
+        cache_key = " ".join(query.lower().split())
+        cached = self._refined_queries.get(cache_key)
+        if cached is not None:
+            self._refined_queries.move_to_end(cache_key)
+            logger.info("Refined query cache hit")
+            return cached
+
         refinement_task = LLMTask(
             task_id="query_refine_001",
             description="Refine initial medical question for search engine",
-            prompt=f"Original medical query: '{query}'\n\nRefined medical query for search engine:",
+            prompt=REFINE_PROMPT_TEMPLATE.format(query=query),
             requires_search_query_refinement=True
         )
 
@@ -110,25 +445,33 @@ class MultiLLMController:
         try:
             response = await query_refiner_agent.execute_task(refinement_task)
             refined = response.content.strip()
+            if len(refined) >= 2 and refined[0] == refined[-1] and refined[0] in "\"'":
+                refined = refined[1:-1].strip()
             final_query = refined if refined else query
-            return AgentResponse(
+            refined_response = AgentResponse(
                 content=final_query,
-                provider=response.provider.value,
+                provider=_PROVIDER_STR[response.provider],
                 model=response.model
             )
+            self._refined_queries[cache_key] = refined_response
+            if len(self._refined_queries) > REFINED_QUERY_CACHE_SIZE:
+                self._refined_queries.popitem(last=False)
+            return refined_response
         except Exception as error:
-            logger.error(f"Gemini API overloaded: {error}. Returning original query.")
+            logger.error("Gemini API overloaded: %s. Returning original query.", error)
             # If the refinement fails or model is overloaded, return the original query
             return  AgentResponse(
             content=query,
-            provider=query_refiner_agent.llm.get_provider().value,
-            model=query_refiner_agent.llm.model
+            provider=self._agent_meta[LLMRole.QUERY_REFINER][0],
+            model=self._agent_meta[LLMRole.QUERY_REFINER][1]
         )
-            # logger.error(f"Error during query refinement: {error}")
+            # logger.error("Error during query refinement: %s", error)
             # return query
 
     async def process_medical_question(self, question: str, web_search_results: Optional[str] = None,
-                                       pubmed_results: Optional[str] = None) -> AgentResult:
+                                       pubmed_results: Optional[str] = None,
+                                       on_token: Optional[Callable[[LLMRole, str], None]] = None,
+                                       refined_query: Optional[AgentResponse] = None) -> AgentResult:
         """
         Processes a medical question through a multi-stage pipeline involving LLM agents
         for research, and validation.
@@ -144,11 +487,20 @@ class MultiLLMController:
 
         3. Compiles all intermediate and final responses into an `AgentResult` object.
 
+        When `LLM_COMBINED_STAGES=true` and both roles share an LLM, steps 1 and 2 are merged
+        into a single structured call (see `_run_combined_stages`).
+
         Args:
             question (str): The medical question to be processed.
             web_search_results (Optional[str]): Pre-fetched web search results.
             pubmed_results (Optional[str]): Pre-fetched PubMed search results.
                 If None, no PubMed data will be included in the research.
+            on_token (Optional[Callable[[LLMRole, str], None]]): Optional callback invoked with the
+                stage role and each text delta, for streaming partial output to a UI. Each stage
+                is streamed from its LLM when set (not applicable to the combined-stages call).
+            refined_query (Optional[AgentResponse]): The response of `refine_initial_query` that produced
+                `question`, reported as the query-refinement entry of the result. Defaults to `question`
+                attributed to the query refiner.
 
         Returns:
             AgentResult: A comprehensive object containing the original question,
@@ -159,147 +511,211 @@ class MultiLLMController:
             RuntimeError: If the research response is empty or invalid.
             Exception: If any error occurs during the processing stages.
         """
-        logger.info(f"Processing medical question: {question}")
+        logger.info("Processing medical question: %s", question)
+        timestamp = datetime.now(timezone.utc)
 
-        research_prompt = f"""Analyze this medical question using the comprehensive search information provided from multiple sources:
+        # Copying very large search payloads would stall other requests, so do it in a worker thread.
+        if len(web_search_results or "") + len(pubmed_results or "") > _OFFLOAD_THRESHOLD:
+            research_input = await asyncio.to_thread(_build_research_input, question, web_search_results, pubmed_results)
+        else:
+            research_input = _build_research_input(question, web_search_results, pubmed_results)
 
-        You have a strict limit of approximately **1000 tokens** for the final output. Adjust detail level, brevity, and formatting accordingly to fit this constraint.
-
-        Original Question: {question}
-        """
+        try:
+            researcher_agent = self.agents[LLMRole.RESEARCHER]
+            validator_agent = self.agents[LLMRole.VALIDATOR]
+            if self.combine_stages and researcher_agent.llm is validator_agent.llm:
+                research_response, validation_response = await self._run_combined_stages(research_input)
+            else:
+                research_response, validation_response = await self._run_sequential_stages(research_input, on_token)
+            logger.info("Medical question processing completed")
 
-        if web_search_results:
-            research_prompt += f"""
+            result = AgentResult(
+                question=question,
+                web_search_results=web_search_results,
+                pubmed_results=pubmed_results,
+                agent_responses=AgentResponses(
+                    query_refinement=refined_query or self._default_refinement(question),
+                    research=AgentResponse(
+                        content=research_response.content,
+                        provider=_PROVIDER_STR[research_response.provider],
+                        model=research_response.model
+                    ),
+                    validation=AgentResponse(
+                        content=validation_response.content,
+                        provider=_PROVIDER_STR[validation_response.provider],
+                        model=validation_response.model
+                    ),
+                ),
+                final_answer=validation_response.content,
+                timestamp=timestamp,
+            )
+            return result
+        except Exception as error:
+            logger.error("Model failed or is overloaded: %s", error)
+            return self._overloaded_result(
+                question, web_search_results, pubmed_results, timestamp,
+                refined_query or self._default_refinement(question)
+            )
 
-        WEB SEARCH RESULTS:
-        {web_search_results}
+    def _default_refinement(self, question: str) -> AgentResponse:
         """
-
-        if pubmed_results:
-            research_prompt += f"""
-
-        PUBMED LITERATURE RESULTS:
-        {pubmed_results}
+        Reports `question` as the query refiner's output when no refinement response was passed in.
         """
+        provider, model = self._agent_meta[LLMRole.QUERY_REFINER]
+        return AgentResponse(content=question, provider=provider, model=model)
 
-        research_prompt += """
+    @staticmethod
+    def _overloaded_result(question: str, web_search_results: Optional[str], pubmed_results: Optional[str],
+                           timestamp: datetime, query_refinement: AgentResponse) -> AgentResult:
+        """
+        Builds the result returned when the research or validation stage fails.
 
-        RESEARCH INSTRUCTIONS:
-        Based on the search results from both web sources and medical literature (if available), extract and synthesize the most relevant and reliable medical information. 
+        The research and validation entries share the module-level `_OVERLOADED_RESPONSE`.
+        """
+        return AgentResult(
+            question=question,
+            web_search_results=web_search_results,
+            pubmed_results=pubmed_results,
+            agent_responses=AgentResponses(
+                query_refinement=query_refinement,
+                research=_OVERLOADED_RESPONSE,
+                validation=_OVERLOADED_RESPONSE,
+            ),
+            final_answer=OVERLOADED_MESSAGE,
+            timestamp=timestamp,
+        )
 
-        Prioritize information in this order:
-        1. Peer-reviewed medical literature (PubMed results)
-        2. Reputable medical sources (Mayo Clinic, WebMD, NIH, medical journals)
-        3. Other credible health websites
+    async def _run_sequential_stages(self, research_input: str,
+                                     on_token: Optional[Callable[[LLMRole, str], None]] = None
+                                     ) -> Tuple[LLMResponse, LLMResponse]:
+        """
+        Runs the RESEARCHER agent and then the VALIDATOR agent on its output.
 
-        Focus on identifying key points about:
-        - Symptoms or conditions mentioned
-        - Potential causes and risk factors
-        - Treatment options and management strategies
-        - When to seek medical care
-        - Prevention measures (if applicable)
+        The stages are expressed as `TaskNode`s and executed by the controller's `TaskDAG`,
+        so further stages only need to declare their dependencies to run as early as possible.
 
-        IMPORTANT GUIDELINES:
-        - Cross-reference information between web and literature sources when possible
-        - If sources contradict each other, mention this and favor peer-reviewed literature
-        - If search results are inconclusive, contradictory, or if information on a particular key point is scarce, state this clearly
-        - Do not invent information or make assumptions beyond what the sources provide
-        - If the question is outside the scope of general medical knowledge, state that appropriately
-        - Emphasize that this information is for educational purposes only
+        When `LLM_SKIP_VALIDATOR=true`, the research output is rendered into the HTML template
+        locally instead of by the VALIDATOR agent, saving one LLM round-trip. The LLM validator
+        is still used when the research text contains phrasing that needs rewriting.
 
-        Synthesize the information from both sources into a coherent, evidence-based response."""
+        Args:
+            research_input (str): The per-question research input (question and search results).
+            on_token (Optional[Callable[[LLMRole, str], None]]): Optional streaming callback, see
+                `process_medical_question`.
 
-        try:
-            research_task = LLMTask(
-                task_id="research_001",
-                description="Research medical question using web and literature sources",
-                prompt=research_prompt,
-                system_prompt=self.agents[LLMRole.RESEARCHER].system_prompts[LLMRole.RESEARCHER],
-                requires_search=True
-            )
+        Returns:
+            Tuple[LLMResponse, LLMResponse]: The research response and the validation response.
 
-            research_response = await self.agents[LLMRole.RESEARCHER].execute_task(research_task)
+        Raises:
+            RuntimeError: If the research response is empty or invalid.
+        """
+        def build_validation_prompt(responses: Dict[str, LLMResponse]) -> str:
+            research_response = responses["research"]
             if not research_response or not research_response.content.strip():
                 raise RuntimeError("Empty research response — cannot proceed to validation")
+            return _with_input(
+                VALIDATION_PROMPT_PREFIX.format(html_wrapper=_HTML_WRAPPER),
+                research_response.content
+            )
 
-            html_wrapper = generator.generate_html()
-            validation_task = LLMTask(
-                task_id="validation_001",
-                description="Validate final medical response",
-                prompt=f"""
-                        You are validating a medical response to ensure it meets safety and quality standards before presenting it to users.
+        research_node = TaskNode(
+            id="research",
+            deps=[],
+            build_prompt=lambda _: _with_input(RESEARCH_PROMPT_PREFIX, research_input),
+            agent_role=LLMRole.RESEARCHER,
+            description="Research medical question using web and literature sources",
+        )
+        validation_node = TaskNode(
+            id="validation",
+            deps=["research"],
+            build_prompt=build_validation_prompt,
+            agent_role=LLMRole.VALIDATOR,
+            description="Validate final medical response",
+        )
+        if not self.skip_validator_llm:
+            results = await self.dag.run([research_node, validation_node], on_token)
+            return results["research"], results["validation"]
+
+        research_response = (await self.dag.run([research_node], on_token))["research"]
+        if not research_response.content.strip():
+            raise RuntimeError("Empty research response — cannot proceed to validation")
+        if _requires_llm_validation(research_response.content):
+            validation_node.deps = []
+            validation_node.build_prompt = lambda _: build_validation_prompt({"research": research_response})
+            validation_response = (await self.dag.run([validation_node], on_token))["validation"]
+        else:
+            validation_response = LLMResponse(
+                content=_render_html(research_response.content),
+                provider=LLMProvider.LOCAL,
+                model="html-renderer"
+            )
+        return research_response, validation_response
 
-                        You have a strict limit of approximately **1000 tokens** for the final output. Adjust the level of detail, brevity, and formatting accordingly to fit within this limit.
+    async def _run_combined_stages(self, research_input: str) -> Tuple[LLMResponse, LLMResponse]:
+        """
+        Runs research and validation as a single structured LLM call.
 
-                        Here is the draft response based on web search and literature review:
+        Used when `LLM_COMBINED_STAGES=true` and the researcher and validator share an LLM.
+        The model returns `{"research": ..., "validation": ...}`, which saves one network
+        round-trip and one prefill of the research context compared to the sequential path.
 
-                        {research_response.content}
+        Args:
+            research_input (str): The per-question research input (question and search results).
 
-                        REQUIREMENTS:
-                        1. Format your final output using HTML only — no markdown or explanations.
-                        2. Use Tailwind CSS classes and structure your content freely as appropriate for the question.
-                        3. Wrap your output with this exact template (do NOT change structure or classes):
+        Returns:
+            Tuple[LLMResponse, LLMResponse]: The research response and the validation response.
 
-                        {html_wrapper}
+        Raises:
+            RuntimeError: If the research section of the response is empty.
+        """
+        validator_agent = self.agents[LLMRole.VALIDATOR]
+        combined_task = LLMTask(
+            task_id="research_validation_001",
+            description="Research and validate medical question in a single call",
+            prompt=_with_input(self._combined_prefix, research_input),
+            system_prompt=self._system_prompts[LLMRole.RESEARCHER],
+            requires_search=True
+        )
+        combined = await validator_agent.execute_structured_task(combined_task, CombinedStagesResponse)
+        if not combined.research.strip():
+            raise RuntimeError("Empty research response — cannot proceed to validation")
+
+        provider = validator_agent.llm.get_provider()
+        model = validator_agent.llm.model
+        return (
+            LLMResponse(content=combined.research, provider=provider, model=model),
+            LLMResponse(content=combined.validation, provider=provider, model=model),
+        )
 
-                        4. Replace {{YOUR_BODY_HTML_HERE}} with your validated content using valid HTML elements.
-                        5. Ensure the disclaimers remain exactly as shown at the top and bottom.
+    async def process_batch(self, questions: List[str], max_concurrency: int = 5,
+                            on_progress: Optional[Callable[[int, int], None]] = None) -> List[AgentResult]:
+        """
+        Processes several medical questions concurrently through the multi-LLM pipeline.
 
-                        Return only the final rendered HTML.
-                        """,
-                system_prompt=self.agents[LLMRole.VALIDATOR].system_prompts[LLMRole.VALIDATOR],
-            )
-            validation_response = await self.agents[LLMRole.VALIDATOR].execute_task(validation_task)
-            logger.info("Medical question processing completed")
+        Within a single question the research and validation stages depend on each other,
+        so they stay sequential; independent questions, however, are run side by side with
+        `asyncio.gather`. An `asyncio.Semaphore` bounds the number of in-flight pipelines so
+        provider rate limits are respected.
 
-            return AgentResult(
-                question=question,
-                web_search_results=web_search_results,
-                pubmed_results=pubmed_results,
-                agent_responses=AgentResponses(
-                    query_refinement=AgentResponse(
-                        content=question,
-                        provider=self.agents[LLMRole.QUERY_REFINER].llm.get_provider().value,
-                        model=self.agents[LLMRole.QUERY_REFINER].llm.model
-                    ),
-                    research=AgentResponse(
-                        content=research_response.content,
-                        provider=research_response.provider.value,
-                        model=research_response.model
-                    ),
-                    validation=AgentResponse(
-                        content=validation_response.content,
-                        provider=validation_response.provider.value,
-                        model=validation_response.model
-                    ),
-                ),
-                final_answer=validation_response.content,
-                timestamp=datetime.now(),
-            )
-        except Exception as error:
-            logger.error(f"Model failed or is overloaded: {error}")
-            message = "The model is currently overloaded due to a high volume of requests. Please try again during off peak hours."
-            return AgentResult(
-                question=question,
-                web_search_results=web_search_results,
-                pubmed_results=pubmed_results,
-                agent_responses=AgentResponses(
-                    query_refinement=AgentResponse(
-                        content=question,
-                        provider=self.agents[LLMRole.QUERY_REFINER].llm.get_provider().value,
-                        model=self.agents[LLMRole.QUERY_REFINER].llm.model
-                    ),
-                    research=AgentResponse(
-                        content=message,
-                        provider="N/A",
-                        model="N/A"
-                    ),
-                    validation=AgentResponse(
-                        content=message,
-                        provider="N/A",
-                        model="N/A"
-                    ),
-                ),
-                final_answer=message,
-                timestamp=datetime.now(),
-            )
+        Args:
+            questions (List[str]): The medical questions to be processed.
+            max_concurrency (int): Maximum number of questions processed at the same time (default: 5).
+            on_progress (Optional[Callable[[int, int], None]]): Optional callback invoked with the number
+                of completed questions and the total after each question finishes.
+
+        Returns:
+            List[AgentResult]: One result per question, in the same order as `questions`.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        completed = 0
+
+        async def _process(question: str) -> AgentResult:
+            nonlocal completed
+            async with semaphore:
+                result = await self.process_medical_question(question)
+            completed += 1
+            if on_progress:
+                on_progress(completed, len(questions))
+            return result
+
+        return list(await asyncio.gather(*(_process(question) for question in questions)))
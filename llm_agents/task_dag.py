@@ -0,0 +1,112 @@
+import asyncio
+import functools
+import logging
+from dataclasses import dataclass, field
+from graphlib import TopologicalSorter
+from typing import Callable, Dict, List, Optional
+
+from .llm_controller import LLMRole, LLMTask, MedicalLLMController
+from .llm_provider import LLMResponse
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TaskNode:
+    """
+    A single LLM stage of a pipeline, expressed as a node of a dependency graph.
+
+    `build_prompt` receives the responses of the node's dependencies (keyed by node id)
+    and returns the prompt for this node; it may raise to abort the pipeline, e.g. when
+    an upstream response is unusable.
+    """
+    id: str
+    deps: List[str]
+    build_prompt: Callable[[Dict[str, LLMResponse]], str]
+    agent_role: LLMRole
+    description: str = field(default="")
+
+
+class TaskDAG:
+    """
+    Executes a graph of `TaskNode`s with the agent assigned to each node's role.
+
+    Every node is started as soon as all of its dependencies have completed, so independent
+    nodes run concurrently while dependent ones wait only for their own inputs. Each node's
+    system prompt is the one its agent resolves for its role.
+
+    Example:
+        >>> dag = TaskDAG(agents)
+        >>> results = await dag.run([
+        ...     TaskNode("research", [], lambda _: research_prompt, LLMRole.RESEARCHER),
+        ...     TaskNode("validation", ["research"], lambda r: r["research"].content, LLMRole.VALIDATOR),
+        ... ])
+    """
+
+    def __init__(self, agents: Dict[LLMRole, MedicalLLMController]):
+        self.agents = agents
+
+    async def run(self, nodes: List[TaskNode],
+                  on_token: Optional[Callable[[LLMRole, str], None]] = None) -> Dict[str, LLMResponse]:
+        """
+        Runs all nodes in dependency order.
+
+        Args:
+            nodes (List[TaskNode]): The nodes of the graph. Dependencies must refer to node ids in `nodes`.
+            on_token (Optional[Callable[[LLMRole, str], None]]): Optional streaming callback invoked with
+                the node's role and each text delta.
+
+        Returns:
+            Dict[str, LLMResponse]: The response of every node, keyed by node id.
+
+        Raises:
+            ValueError: If a dependency is unknown or the graph contains a cycle.
+            Exception: The first error raised by a node; the remaining running nodes are cancelled,
+                and errors of other nodes that failed at the same time are discarded.
+        """
+        by_id = {node.id: node for node in nodes}
+        for node in nodes:
+            unknown = set(node.deps) - by_id.keys()
+            if unknown:
+                raise ValueError(f"Task node {node.id} depends on unknown nodes: {sorted(unknown)}")
+
+        sorter = TopologicalSorter({node.id: node.deps for node in nodes})
+        try:
+            sorter.prepare()
+        except Exception as error:
+            raise ValueError(f"Task graph is not acyclic: {error}") from error
+
+        results: Dict[str, LLMResponse] = {}
+        running: Dict[asyncio.Task, str] = {}
+        try:
+            while sorter.is_active():
+                for node_id in sorter.get_ready():
+                    running[asyncio.create_task(self._run_node(by_id[node_id], results, on_token))] = node_id
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                finished = [(running.pop(task), task) for task in done]
+                # Retrieve every error before raising, so none is reported as never retrieved.
+                errors = [task.exception() for _, task in finished if not task.cancelled() and task.exception()]
+                if errors:
+                    raise errors[0]
+                for node_id, task in finished:
+                    results[node_id] = task.result()
+                    sorter.done(node_id)
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+        return results
+
+    async def _run_node(self, node: TaskNode, results: Dict[str, LLMResponse],
+                        on_token: Optional[Callable[[LLMRole, str], None]]) -> LLMResponse:
+        agent = self.agents[node.agent_role]
+        task = LLMTask(
+            task_id=node.id,
+            description=node.description,
+            prompt=node.build_prompt({dep: results[dep] for dep in node.deps}),
+        )
+        logger.info("Starting task node %s", node.id)
+        return await agent.execute_task(
+            task,
+            on_token=functools.partial(on_token, node.agent_role) if on_token else None
+        )
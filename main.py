@@ -1,21 +1,116 @@
+import asyncio
+import gzip
+import hashlib
 import logging
 import os
 
-import time
+from contextlib import asynccontextmanager
+from typing import Dict, Tuple
+from urllib.parse import parse_qs
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from fastapi.responses import HTMLResponse
+import orjson
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
 
-from mcp_services.mcp_client.search_mcp_client import MCPClient
+from llm_agents._http import aclose_shared_client
+from llm_agents.llm_controller import LLMRole
+from llm_agents.multi_llm_controller import AgentResult
+from mcp_services.mcp_client.search_mcp_client import MCP_IN_PROCESS_TOOLS, SEARCH_SERVER_SCRIPT, MCPClient, controller
 
-logging.basicConfig(level=logging.INFO)
+# Library modules only create loggers; logging is configured once here. Production defaults to
+# WARNING so per-request INFO records are neither formatted nor written.
+logging.basicConfig(
+    level=os.environ.get("LOG_LEVEL", "WARNING" if os.environ.get("ENV") == "production" else "INFO")
+)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifespan: starts the MCP search server once and pre-warms the LLM provider
+    connections on startup; stops the server and closes the shared LLM HTTP connection pool
+    on shutdown.
+
+    The MCP session is entered and exited in this task, as its stdio transport requires.
+    """
+    warmup = asyncio.create_task(controller.warmup())
+    if not MCP_IN_PROCESS_TOOLS:
+        await client.connect_to_server(SEARCH_SERVER_SCRIPT)
+    await warmup
+    yield
+    await client.close()
+    await aclose_shared_client()
+
+
+# Versioned asset URLs (`?v=<content hash>`) change whenever the file does, so they can be cached forever.
+_IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class CompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves gzip-compressed files and long-lived caching for versioned URLs.
+
+    Each file is compressed once per modification time and kept in memory, instead of being
+    re-compressed by the GZip middleware on every request. The gzip representation has its
+    own ETag, since its bytes differ from the file's.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._gzipped: Dict[str, Tuple[float, bytes]] = {}
+
+    async def get_response(self, path: str, scope) -> Response:
+        response = await super().get_response(path, scope)
+        if not isinstance(response, FileResponse):
+            return response
+        headers = {"Vary": "Accept-Encoding"}
+        if "v" in parse_qs(scope.get("query_string", b"").decode("latin-1")):
+            headers["Cache-Control"] = _IMMUTABLE_CACHE_CONTROL
+        request_headers = Headers(scope=scope)
+        if "gzip" not in request_headers.get("accept-encoding", ""):
+            response.headers.update(headers)
+            return response
+        headers["ETag"] = _gzip_etag(response.headers["etag"])
+        headers["Last-Modified"] = response.headers["last-modified"]
+        if _etag_matches(request_headers.get("if-none-match", ""), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        body = await self._gzip(response.path, response.stat_result.st_mtime)
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=body, media_type=response.media_type, headers=headers)
+
+    async def _gzip(self, file_path: str, mtime: float) -> bytes:
+        cached = self._gzipped.get(file_path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, await asyncio.to_thread(_read_gzipped, file_path))
+            self._gzipped[file_path] = cached
+        return cached[1]
+
+
+def _gzip_etag(etag: str) -> str:
+    """
+    Returns the ETag of a file's gzip representation: its quoted ETag with a `-gzip` suffix.
+    """
+    return f'{etag[:-1]}-gzip"'
+
+
+def _read_gzipped(file_path: str) -> bytes:
+    """
+    Reads a file and returns its gzip-compressed content; blocking, so it runs in a worker thread.
+    """
+    with open(file_path, "rb") as file:
+        return gzip.compress(file.read(), 9)
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+# Compresses dynamic responses such as the /mcp JSON; pages and static files are served pre-compressed.
+app.add_middleware(GZipMiddleware, minimum_size=512)
 # Serve static files (like script.js)
-app.mount("/utils", StaticFiles(directory="utils"), name="utils")
+app.mount("/utils", CompressedStaticFiles(directory="utils"), name="utils")
 
 client = MCPClient()
 if os.environ.get("ENV") != "production":
@@ -26,18 +121,49 @@ if env == "production":
     base_url = "https://multi-llm-agent-system.onrender.com"
 else:
     base_url = "http://0.0.0.0:8000"
-class QueryRequest(BaseModel):
+async def _read_query(request: Request) -> str:
     """
-       Pydantic model for validating the structure of incoming query requests.
+    Extracts the user's question from a `{"query": "..."}` JSON request body.
+
+    The body is decoded with orjson and the single field is checked by hand, skipping the
+    per-request Pydantic model validation for a one-field schema.
 
-       Attributes:
-           query (str): The medical question string submitted by the user.
-       """
-    query: str
+    Args:
+        request (Request): The incoming request.
+
+    Returns:
+        str: The non-empty query string.
+
+    Raises:
+        HTTPException: 400 if the body is not valid JSON or the query is missing or empty.
+    """
+    try:
+        body = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Request body must be valid JSON.")
+    query = body.get("query") if isinstance(body, dict) else None
+    if not isinstance(query, str) or not query:
+        raise HTTPException(status_code=400, detail="Query cannot be empty.")
+    return query
+
+
+# Results whose text fields exceed this many characters are JSON-encoded in a worker thread, so
+# serializing large search payloads does not stall other requests on the event loop.
+JSON_OFFLOAD_THRESHOLD = 100_000
+
+
+async def _encode_result(result: AgentResult) -> bytes:
+    """
+    Encodes a pipeline result as JSON with orjson, off the event loop when it is large.
+    """
+    size = len(result.final_answer) + len(result.web_search_results or "") + len(result.pubmed_results or "")
+    if size > JSON_OFFLOAD_THRESHOLD:
+        return await asyncio.to_thread(orjson.dumps, result)
+    return orjson.dumps(result)
 
 
 @app.post("/mcp")
-async def run_mcp(request: QueryRequest):
+async def run_mcp(request: Request):
     """
     API endpoint to process a medical question using the Multi-LLM pipeline.
 
@@ -47,45 +173,87 @@ async def run_mcp(request: QueryRequest):
     report issues during the LLM operations.
 
     Args:
-        request (QueryRequest): The incoming request body containing the user's query.
+        request (Request): The incoming request; its JSON body carries the user's `query`.
 
     Returns:
-        AgentResult: A Pydantic object containing the question, search results,
-                     responses from individual agents, and the final HTML answer.
-                     FastAPI automatically serializes this object to JSON.
+        Response: The `AgentResult` (question, search results, responses from individual
+                  agents, and the final HTML answer) encoded as JSON with orjson, which
+                  serializes the result dataclasses natively.
 
     Raises:
         HTTPException: If an error occurs during the processing of the query,
                        a 500 Internal Server Error is returned with the error details.
     """
-    if not request.query:
-        raise HTTPException(status_code=400, detail="Query cannot be empty.")
+    query = await _read_query(request)
     try:
-        logger.info(f"Received query: {request.query}")
+        logger.info("Received query: %s", query)
 
-        result = await client.run(request.query)
-        logger.info(f"Search results: DONE")
-        return result
+        result = await client.run(query)
+        logger.info("Search results: DONE")
+        return Response(content=await _encode_result(result), media_type="application/json")
     except Exception as error:
-        logger.error(f"Error during MCP operation: {error}")
+        logger.error("Error during MCP operation: %s", error)
         raise HTTPException(status_code=500, detail=str(error))
 
 
-@app.get('/', response_class=HTMLResponse)
-def index():
+def _sse(event: str, data) -> bytes:
     """
-        Serves the main HTML page for the HealthConnect web application.
+    Encodes one Server-Sent Event with a JSON payload.
+    """
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
 
-        This endpoint returns the `index.html` content, which includes the user interface
-        for submitting medical questions and displaying answers. It incorporates a
-        cache-busting timestamp for the `script.js` file to ensure the latest version is loaded.
 
-        Returns:
-            HTMLResponse: The HTML content of the main application page.
-        """
-    timestamp = int(time.time())
+@app.post("/mcp/stream")
+async def run_mcp_stream(request: Request):
+    """
+    API endpoint to process a medical question and stream progress as Server-Sent Events.
+
+    Emits a `token` event (`{"stage": ..., "delta": ...}`) for each piece of text generated by
+    the research and validation stages, then a single `result` event carrying the same
+    `AgentResult` JSON as `/mcp`, or an `error` event if processing fails.
+
+    Args:
+        request (Request): The incoming request; its JSON body carries the user's `query`.
+
+    Returns:
+        StreamingResponse: A `text/event-stream` response.
+
+    Raises:
+        HTTPException: If the body is not valid JSON or the query is empty.
+    """
+    query = await _read_query(request)
+    events: "asyncio.Queue[bytes | None]" = asyncio.Queue()
+
+    def on_token(role: LLMRole, delta: str) -> None:
+        events.put_nowait(_sse("token", {"stage": role.value, "delta": delta}))
+
+    async def run_pipeline() -> None:
+        try:
+            result = await client.run(query, on_token=on_token)
+            events.put_nowait(_sse("result", result))
+        except Exception as error:
+            logger.error("Error during MCP operation: %s", error)
+            events.put_nowait(_sse("error", {"detail": str(error)}))
+        finally:
+            events.put_nowait(None)
 
-    return HTMLResponse(content=f"""
+    async def stream():
+        pipeline = asyncio.create_task(run_pipeline())
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+        finally:
+            pipeline.cancel()
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+# The pages only depend on settings fixed at startup, so they are rendered and encoded once.
+# The script.js cache-buster is a hash of its content, so cached copies stay valid until it changes.
+with open("utils/script.js", "rb") as _script:
+    _SCRIPT_VERSION = hashlib.md5(_script.read()).hexdigest()[:12]
+
+_INDEX_HTML = f"""
     <html>
   <head>
     <link rel="preconnect" href="https://fonts.gstatic.com/" crossorigin="" />
@@ -162,25 +330,12 @@ def index():
         </div>
       </div>
     </div>
-    <script src="/utils/script.js?v={timestamp}"></script>
+    <script src="/utils/script.js?v={_SCRIPT_VERSION}"></script>
   </body>
 </html>
-    """)
+    """.encode()
 
-
-@app.get("/about", response_class=HTMLResponse)
-def about():
-    """
-        Serves the About page for the HealthConnect application.
-
-        This endpoint provides detailed information about the project's purpose,
-        technology stack, and how it leverages AI and web search to deliver
-        reliable medical information.
-
-        Returns:
-            HTMLResponse: The HTML content of the About page.
-        """
-    return HTMLResponse(content=f"""
+_ABOUT_HTML = f"""
         <html>
       <head>
         <link rel="preconnect" href="https://fonts.gstatic.com/" crossorigin="" />
@@ -249,4 +404,86 @@ def about():
         </div>
       </body>
     </html>
-        """)
+        """.encode()
+
+_INDEX_HTML_GZIP = gzip.compress(_INDEX_HTML)
+_ABOUT_HTML_GZIP = gzip.compress(_ABOUT_HTML)
+
+_INDEX_ETAG = f'"{hashlib.md5(_INDEX_HTML).hexdigest()}"'
+_ABOUT_ETAG = f'"{hashlib.md5(_ABOUT_HTML).hexdigest()}"'
+
+_PAGE_CACHE_CONTROL = "public, max-age=3600"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Returns True when an `If-None-Match` header value matches `etag`.
+
+    The header is `*` or a comma-separated list of entity tags. If-None-Match uses weak
+    comparison, so a `W/` prefix on either side is ignored.
+    """
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+def _html_page(request: Request, body: bytes, gzipped_body: bytes, etag: str) -> Response:
+    """
+    Returns a pre-rendered page, gzip-encoded when the client accepts it.
+
+    A request whose `If-None-Match` carries the page's ETag gets an empty 304 response.
+
+    Args:
+        request (Request): The incoming request, used for content negotiation.
+        body (bytes): The UTF-8 encoded page.
+        gzipped_body (bytes): The same page, gzip-compressed.
+        etag (str): The quoted ETag of the page.
+
+    Returns:
+        Response: The page with caching headers, or 304 Not Modified.
+    """
+    headers = {"Cache-Control": _PAGE_CACHE_CONTROL, "Vary": "Accept-Encoding", "ETag": etag}
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return HTMLResponse(content=gzipped_body, headers=headers)
+    return HTMLResponse(content=body, headers=headers)
+
+
+@app.get('/', response_class=HTMLResponse)
+def index(request: Request):
+    """
+        Serves the main HTML page for the HealthConnect web application.
+
+        This endpoint returns the `index.html` content, which includes the user interface
+        for submitting medical questions and displaying answers. It incorporates a
+        content-hash cache-buster for the `script.js` file to ensure the latest version is loaded.
+        The page is pre-rendered and pre-compressed at import time.
+
+        Args:
+            request (Request): The incoming request.
+
+        Returns:
+            HTMLResponse: The HTML content of the main application page.
+        """
+    return _html_page(request, _INDEX_HTML, _INDEX_HTML_GZIP, _INDEX_ETAG)
+
+
+@app.get("/about", response_class=HTMLResponse)
+def about(request: Request):
+    """
+        Serves the About page for the HealthConnect application.
+
+        This endpoint provides detailed information about the project's purpose,
+        technology stack, and how it leverages AI and web search to deliver
+        reliable medical information. The page is pre-rendered and pre-compressed at import time.
+
+        Args:
+            request (Request): The incoming request.
+
+        Returns:
+            HTMLResponse: The HTML content of the About page.
+        """
+    return _html_page(request, _ABOUT_HTML, _ABOUT_HTML_GZIP, _ABOUT_ETAG)
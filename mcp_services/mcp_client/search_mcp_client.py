@@ -5,22 +5,106 @@ This module provides a client interface for processing queries through a multi-L
 medical agent system with MCP web search capabilities.
 """
 import asyncio
+import dataclasses
+import functools
+import hashlib
 import logging
 import os
-from contextlib import AsyncExitStack
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 
+import anyio
 from dotenv import load_dotenv
-from mcp import ClientSession, StdioServerParameters, stdio_client
+from mcp import ClientSession, McpError, StdioServerParameters, stdio_client
+from mcp.types import CONNECTION_CLOSED, Tool
 
-from llm_agents.multi_llm_controller import MultiLLMController, AgentResult
+from llm_agents.llm_cache import ExactLLMCache
+from llm_agents.llm_controller import LLMRole
+from llm_agents.multi_llm_controller import OVERLOADED_MESSAGE, MultiLLMController, AgentResult
 
 controller = MultiLLMController()
 load_dotenv()
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# MCP server providing the search tools, spawned as a stdio subprocess.
+SEARCH_SERVER_SCRIPT = "mcp_services/mcp_server/search.py"
+
+# Longest wait for a search tool result over MCP. Also bounds calls sent to a server process
+# that died before answering.
+MCP_TOOL_TIMEOUT_SECONDS = 60
+
+# When true, the search tools are called in this process instead of over the MCP stdio
+# transport, saving the JSON-RPC round trip through the subprocess on every search.
+MCP_IN_PROCESS_TOOLS = os.environ.get("MCP_IN_PROCESS_TOOLS") == "true"
+
+# Searches start with the raw question while the refiner runs, unless `SPECULATIVE_SEARCH=false`.
+# A discarded speculative search still costs a SerpAPI request and NCBI requests (cancelling
+# it does not un-send them), so deployments short on search quota can turn it off.
+SPECULATIVE_SEARCH = os.environ.get("SPECULATIVE_SEARCH", "true") == "true"
+
+# Minimum token overlap (Jaccard) between the raw and the refined query for the
+# speculative raw-query search results to be used instead of re-searching.
+SPECULATIVE_SEARCH_MIN_OVERLAP = 0.7
+
+
+# Complete pipeline results of recent questions, keyed on the normalized question.
+RESULT_CACHE_SIZE = 512
+RESULT_CACHE_TTL_SECONDS = 3600.0
+RESULT_CACHE: ExactLLMCache[AgentResult] = ExactLLMCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL_SECONDS)
+
+
+def _result_key(query: str) -> str:
+    """
+    Returns the result-cache key of a question: a digest of its lower-cased, whitespace-normalized text.
+    """
+    return hashlib.blake2b(_normalize_query(query).encode(), digest_size=16).hexdigest()
+
+
+def _normalize_query(query: str) -> str:
+    """
+    Returns `query` lower-cased with runs of whitespace collapsed to single spaces.
+    """
+    return " ".join(query.lower().split())
+
+
+def _token_overlap(first: str, second: str) -> float:
+    """
+    Returns the Jaccard similarity of the lower-cased word sets of two queries.
+    """
+    first_tokens, second_tokens = set(first.lower().split()), set(second.lower().split())
+    if not first_tokens or not second_tokens:
+        return 0.0
+    return len(first_tokens & second_tokens) / len(first_tokens | second_tokens)
+
+
+def _has_sources(search_results: Optional[str]) -> bool:
+    """
+    Returns True when a search tool's output lists at least one result.
+
+    Both tools return a JSON array of result objects on success; failed calls are None, and
+    empty, "not found" and error outcomes are plain-text messages or an empty array.
+    """
+    return search_results is not None and search_results.startswith("[{")
+
+
+def _is_connection_error(error: BaseException) -> bool:
+    """
+    Returns True when `error` means the MCP stdio connection to the server is gone.
+    """
+    if isinstance(error, (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream)):
+        return True
+    return isinstance(error, McpError) and error.error.code == CONNECTION_CLOSED
+
+
+@functools.cache
+def _in_process_tools() -> Dict[str, Callable[[dict], Awaitable[list]]]:
+    """
+    Imports the MCP server's tool functions for in-process use, on first call.
+    """
+    from mcp_services.mcp_server import search
+    return {"search_pubmed": search.search_pubmed_literature, "web_search": search.web_search}
+
 
 class MCPClient:
     """
@@ -36,8 +120,11 @@ class MCPClient:
     """
     def __init__(self):
         self.session: Optional[ClientSession] = None
-        self.exit_stack = AsyncExitStack()
-        logger.info(f"Initializing MCP Web Search Client")
+        self._server_script_path: Optional[str] = None
+        self._session_task: Optional[asyncio.Task] = None
+        self._session_stop = asyncio.Event()
+        self._reconnect_lock = asyncio.Lock()
+        logger.info("Initializing MCP Web Search Client")
 
     async def connect_to_server(self, server_script_path: str):
         """
@@ -45,6 +132,7 @@ class MCPClient:
 
            This method initializes a ClientSession and connects to the specified
            MCP server script, allowing for interaction with the MultiLLMController.
+           The session is held open by a background task until `close` is called.
 
            Args:
                server_script_path (str): The file path to the MCP server script.
@@ -55,42 +143,99 @@ class MCPClient:
            Raises:
                Exception: If the connection to the MCP server fails.
            """
+        self._server_script_path = server_script_path
+        self._session_stop = asyncio.Event()
+        ready: "asyncio.Future[List[Tool]]" = asyncio.get_running_loop().create_future()
+        self._session_task = asyncio.create_task(self._hold_session(server_script_path, ready, self._session_stop))
         try:
-            params = StdioServerParameters(
-                command='python',
-                args=[server_script_path],
-                env=os.environ.copy() or None
-            )
+            tools = await ready
+        except Exception as e:
+            logger.error("Failed to connect to MCP server: %s", e)
+            raise
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Connected to MCP server with tools: %s", [tool.name for tool in tools])
+        return tools
 
-            stdio_transport = await self.exit_stack.enter_async_context(stdio_client(params))
-            self.session = await self.exit_stack.enter_async_context(
-                ClientSession(stdio_transport[0], stdio_transport[1]))
+    async def _hold_session(self, server_script_path: str, ready: "asyncio.Future[List[Tool]]",
+                            stop: asyncio.Event) -> None:
+        """
+        Opens the MCP stdio session, keeps it open until `stop` is set, then closes it.
 
-            await self.session.initialize()
-            response = await self.session.list_tools()
-            tools = response.tools
-            print(f"Connected to MCP server with tools: {[tool.name for tool in tools]}")
+        The stdio transport's anyio cancel scopes must be entered and exited by the same task,
+        so the session lives in this dedicated task instead of the tasks that connect, reconnect
+        or close it. `ready` receives the server's tools, or the error if the connection failed.
+        """
+        params = StdioServerParameters(
+            command='python',
+            args=[server_script_path],
+            env=os.environ.copy() or None
+        )
+        session = None
+        try:
+            async with stdio_client(params) as (read_stream, write_stream):
+                async with ClientSession(
+                        read_stream, write_stream,
+                        read_timeout_seconds=timedelta(seconds=MCP_TOOL_TIMEOUT_SECONDS)
+                ) as session:
+                    await session.initialize()
+                    response = await session.list_tools()
+                    self.session = session
+                    ready.set_result(response.tools)
+                    await stop.wait()
+        except Exception as error:
+            if not ready.done():
+                ready.set_exception(error)
+            else:
+                logger.error("MCP session ended: %s", error)
+        finally:
+            if not ready.done():
+                ready.cancel()
+            if session is not None and self.session is session:
+                self.session = None
 
-            return tools
+    def _session_alive(self) -> bool:
+        """Returns True while the task holding the MCP session is running."""
+        return self._session_task is not None and not self._session_task.done()
 
-        except Exception as e:
-            logger.error(f"Failed to connect to MCP server: {e}")
-            raise
+    async def _reconnect(self, failed_session: Optional[ClientSession]) -> ClientSession:
+        """
+        Replaces a lost MCP session with a new one and returns it.
 
+        Concurrent callers whose calls failed on the same session share a single reconnect.
+        """
+        async with self._reconnect_lock:
+            if self.session is not None and self.session is not failed_session:
+                return self.session
+            if self._server_script_path is None:
+                raise RuntimeError("MCP client was never connected")
+            logger.warning("Reconnecting to the MCP server")
+            await self.close()
+            await self.connect_to_server(self._server_script_path)
+            return self.session
 
-    async def run(self, query: str) -> AgentResult:
+    async def run(self, query: str, on_token: Optional[Callable[[LLMRole, str], None]] = None) -> AgentResult:
         """
         Processes a medical question using the MultiLLMController.
 
         This asynchronous method takes a user's medical query, passes it to the
         MultiLLMController for multi-stage processing (including refinement,
         research, and validation), and returns the final structured result.
+        Requests share the MCP server session opened by `connect_to_server`; if none is
+        open, a session is started for this call and closed afterwards.
+
+        Results are cached for `RESULT_CACHE_TTL_SECONDS` per normalized question, and concurrent
+        non-streaming requests for the same question share one pipeline run. Streaming requests
+        (`on_token`) always run their own pipeline, so each stream receives its deltas and is
+        cancelled with its caller. "Overloaded" fallback results and answers built without
+        results from both search sources are not cached, and cache hits carry the current time.
 
         Args:
             query (str): The medical question string provided by the user.
+            on_token (Optional[Callable[[LLMRole, str], None]]): Optional callback receiving the
+                stage role and each text delta of the research and validation stages.
 
         Returns:
-            AgentResult: A Pydantic object containing the comprehensive results
+            AgentResult: A dataclass containing the comprehensive results
                          of the medical question processing, including agent responses
                          and the final formatted answer.
 
@@ -102,39 +247,139 @@ class MCPClient:
         if not query:
             raise ValueError("Query cannot be empty.")
 
+        key = _result_key(query)
+        cached = RESULT_CACHE.get(key)
+        if cached is not None:
+            return dataclasses.replace(cached, timestamp=datetime.now(timezone.utc))
+        if on_token is None:
+            result = await RESULT_CACHE.coalesce(key, lambda: self._run_with_session(query, None))
+        else:
+            result = await self._run_with_session(query, on_token)
+        # Only complete answers are cached: a degraded answer produced while a provider or a
+        # search source was down would otherwise be served for the whole cache lifetime.
+        if (
+                result.final_answer != OVERLOADED_MESSAGE
+                and _has_sources(result.web_search_results)
+                and _has_sources(result.pubmed_results)
+        ):
+            RESULT_CACHE.set(key, result)
+        return result
+
+    async def _run_with_session(self, query: str, on_token: Optional[Callable[[LLMRole, str], None]]) -> AgentResult:
+        """
+        Runs the pipeline over the shared MCP session, or over a session opened for this call only.
+        """
+        if self._server_script_path is None and not MCP_IN_PROCESS_TOOLS:
+            # Not connected by the application at startup: use a session for this call only,
+            # held by a client of its own so concurrent calls never share or close each other's
+            # session. A shared session that was lost is reopened by `_call_search_tool` instead.
+            call_client = MCPClient()
+            await call_client.connect_to_server(SEARCH_SERVER_SCRIPT)
+            try:
+                return await call_client._run(query, on_token)
+            finally:
+                await call_client.close()
+        return await self._run(query, on_token)
+
+    async def _run(self, query: str, on_token: Optional[Callable[[LLMRole, str], None]]) -> AgentResult:
+        """
+        Runs refinement, both searches and the LLM pipeline over the connected MCP session.
+        """
         try:
-            await self.connect_to_server("mcp_services/mcp_server/search.py")
+            # With SPECULATIVE_SEARCH, search with the raw query while the refiner runs and keep
+            # the results if refinement does not change the query materially; otherwise cancel
+            # them and search again. A failed search yields None, so the other source is still used.
+            async with asyncio.TaskGroup() as task_group:
+                if SPECULATIVE_SEARCH:
+                    pubmed_task, web_search_task = self._start_searches(task_group, query)
+                refined_query = await controller.refine_initial_query(query)
+                logger.info("Refined query: %s", refined_query)
 
-            refined_query = await controller.refine_initial_query(query)
-            logger.info(f"Refined query: {refined_query}")
+                if not SPECULATIVE_SEARCH:
+                    pubmed_task, web_search_task = self._start_searches(task_group, refined_query.content)
+                elif _token_overlap(query, refined_query.content) < SPECULATIVE_SEARCH_MIN_OVERLAP:
+                    pubmed_task.cancel()
+                    web_search_task.cancel()
+                    pubmed_task, web_search_task = self._start_searches(task_group, refined_query.content)
 
-            pubmed_task = self.session.call_tool(
-                name="search_pubmed",
-                arguments={"query": refined_query.content, "max_results": 5}
-            )
-            web_search_task = self.session.call_tool(
-                name="web_search",
-                arguments={"query": refined_query.content}
-            )
-            pubmed_search_results, web_search_results = await asyncio.gather(
-                pubmed_task,
-                web_search_task
-            )
+            pubmed_search_results, web_search_results = pubmed_task.result(), web_search_task.result()
 
-            logger.info(f"PubMed search completed successfully")
-            return await controller.process_medical_question(refined_query.content, web_search_results.content[0].text, pubmed_search_results.content[0].text)
+            logger.info("PubMed search completed successfully")
+            return await controller.process_medical_question(
+                refined_query.content, web_search_results, pubmed_search_results,
+                on_token=on_token, refined_query=refined_query
+            )
 
         except Exception as e:
-            logger.error(f"Error in run method: {e}")
+            logger.error("Error in run method: %s", e)
             raise
-        finally:
-            await self.close()
+
+    def _start_searches(self, task_group: asyncio.TaskGroup, search_query: str) -> Tuple[asyncio.Task, asyncio.Task]:
+        """
+        Starts the PubMed and web search tool calls for `search_query` as concurrent tasks.
+
+        Args:
+            task_group (asyncio.TaskGroup): The task group that owns the search tasks.
+            search_query (str): The query to search for.
+
+        Returns:
+            Tuple[asyncio.Task, asyncio.Task]: The PubMed search task and the web search task,
+                each resolving to the tool's text output, or None if the search failed.
+        """
+        pubmed_task = task_group.create_task(self._call_search_tool(
+            "search_pubmed",
+            {"query": search_query, "max_results": 5}
+        ))
+        web_search_task = task_group.create_task(self._call_search_tool(
+            "web_search",
+            {"query": search_query}
+        ))
+        return pubmed_task, web_search_task
+
+    async def _call_search_tool(self, name: str, arguments: dict) -> Optional[str]:
+        """
+        Calls a search tool on the MCP server and returns its text output.
+
+        A failing search is logged and reported as None rather than raised, so one
+        unavailable source does not abort the other search or the pipeline. If the MCP server
+        process has died, the client reconnects and retries the call once. With
+        `MCP_IN_PROCESS_TOOLS=true` the tool function is awaited directly instead.
+
+        Args:
+            name (str): The tool name.
+            arguments (dict): The tool arguments.
+
+        Returns:
+            Optional[str]: The text content of the tool result, or None if the call failed.
+        """
+        try:
+            if MCP_IN_PROCESS_TOOLS:
+                return (await _in_process_tools()[name](arguments))[0].text
+            session = self.session
+            if session is None or not self._session_alive():
+                session = await self._reconnect(session)
+            try:
+                result = await session.call_tool(name=name, arguments=arguments)
+            except Exception as error:
+                if not (_is_connection_error(error) or not self._session_alive()):
+                    raise
+                logger.warning("MCP session lost during %s (%s); retrying once", name, error)
+                session = await self._reconnect(session)
+                result = await session.call_tool(name=name, arguments=arguments)
+            return result.content[0].text
+        except Exception as error:
+            logger.error("Search tool %s failed: %s", name, error)
+            return None
 
     async def close(self):
         """Close the client session and cleanup resources."""
+        task, self._session_task = self._session_task, None
+        if task is None:
+            return
+        self._session_stop.set()
         try:
-            await self.exit_stack.aclose()
+            await task
         except Exception as e:
-            logger.error(f"Error closing client: {e}")
-
-
+            logger.error("Error closing client: %s", e)
+        finally:
+            self.session = None
@@ -1,16 +1,37 @@
+import asyncio
 import logging
-import requests
+import time
+import httpx
 import xml.etree.ElementTree as ET
-import json
+import orjson
 
-from typing import List
-from pydantic import BaseModel
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from pydantic import BaseModel, TypeAdapter
 
-from web_search_helper import SearchResult
+try:
+    from web_search_helper import SearchResult
+except ImportError:
+    from .web_search_helper import SearchResult
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Keep-alive connection pool to NCBI E-utilities, shared by every PubMedHelper. The esearch and
+# efetch calls of a search reuse one TLS connection (multiplexed over HTTP/2), and the requests no
+# longer block the event loop.
+NCBI_CLIENT = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=20, keepalive_expiry=60),
+    timeout=httpx.Timeout(20.0, connect=10.0),
+    http2=True,
+)
+
+# Hard ceiling on articles fetched per search, bounding the E-fetch response size.
+PUBMED_MAX_RESULTS = 20
+
+# Size and lifetime of the per-helper cache of PubMed search results.
+PUBMED_CACHE_SIZE = 1024
+PUBMED_CACHE_TTL_SECONDS = 3600
+
 
 class PubMedResult(BaseModel):
     """
@@ -23,6 +44,65 @@ class PubMedResult(BaseModel):
     source: str  # Stores the journal title or "PubMed"
 
 
+# Results without articles, built once and shared; callers never mutate search results.
+_NO_ARTICLES_RESULT = SearchResult.model_construct(search_results="No articles found for the given query.", sources_urls=[])
+_FETCH_ERROR_RESULT = SearchResult.model_construct(
+    search_results="Error fetching PubMed articles. Please try again later.", sources_urls=[]
+)
+_UNEXPECTED_ERROR_RESULT = SearchResult.model_construct(
+    search_results="An unexpected error occurred while processing PubMed articles.", sources_urls=[]
+)
+
+# Serializes article lists straight to JSON with pydantic-core, without intermediate dicts.
+_ARTICLES_ADAPTER = TypeAdapter(List[PubMedResult])
+
+
+# Element paths relative to a <PubmedArticle>. They spell out each level of the E-fetch schema
+# instead of using `.//` descendant searches, so every lookup only walks one branch of the article.
+_PMID_PATH = "MedlineCitation/PMID"
+_TITLE_PATH = "MedlineCitation/Article/ArticleTitle"
+_ABSTRACT_TEXT_PATH = "MedlineCitation/Article/Abstract/AbstractText"
+_JOURNAL_TITLE_PATH = "MedlineCitation/Article/Journal/Title"
+
+
+def _format_abstract_text(abs_text_elem: ET.Element) -> str:
+    """
+    Formats one <AbstractText> section, prefixing labelled sections with their bold label.
+    """
+    label = abs_text_elem.get('Label')
+    text_content = abs_text_elem.text.strip()
+    return f"**{label.capitalize()}**: {text_content}" if label else text_content
+
+
+def _parse_article(pubmed_article: ET.Element) -> Optional[PubMedResult]:
+    """
+    Extracts a PubMedResult from a <PubmedArticle> element, or None if it has no PMID or title.
+    """
+    pmid_element = pubmed_article.find(_PMID_PATH)
+    pmid = pmid_element.text if pmid_element is not None else None
+
+    article_title_element = pubmed_article.find(_TITLE_PATH)
+    title = article_title_element.text if article_title_element is not None else None
+    if not pmid or not title:
+        return None
+
+    snippet = "\n\n".join(
+        _format_abstract_text(abs_text_elem)
+        for abs_text_elem in pubmed_article.iterfind(_ABSTRACT_TEXT_PATH)
+        if abs_text_elem.text and not abs_text_elem.text.isspace()
+    ) or 'No abstract available.'
+
+    journal_title_element = pubmed_article.find(_JOURNAL_TITLE_PATH)
+    journal_title = journal_title_element.text if journal_title_element is not None else 'PubMed Journal'
+
+    return PubMedResult.model_construct(
+        title=title,
+        url=f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/",
+        snippet=snippet,
+        source=journal_title
+    )
+
+
 class PubMedHelper:
     """
     Helper class for interacting with the PubMed/NCBI E-utilities API.
@@ -31,10 +111,14 @@ class PubMedHelper:
     from the PubMed database using the NCBI E-utilities API.
     """
 
-    def __init__(self):
+    def __init__(self, http_client: httpx.AsyncClient = NCBI_CLIENT):
+        self.http_client = http_client
         self.e_search_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
         self.e_fetch_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
         self.logger = logging.getLogger(__name__)
+        # LRU of (query, max_results) -> (expiry, result); only searches that found articles are kept.
+        self._results: "OrderedDict[Tuple[str, int], Tuple[float, SearchResult]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, int], "asyncio.Future[SearchResult]"] = {}
 
     async def get_article_ids(self, query: str, max_results: int = 5) -> List[str]:
         """
@@ -49,10 +133,17 @@ class PubMedHelper:
 
         Returns:
             List[str]: List of PubMed IDs (PMIDs) as strings
+        """
+        ids, _ = await self._search(query, max_results)
+        return ids
 
-        Raises:
-            requests.RequestException: If the API request fails
-            KeyError: If the response format is unexpected
+    async def _search(self, query: str, max_results: int) -> Tuple[List[str], Optional[Dict[str, str]]]:
+        """
+        Runs E-search with the NCBI history server enabled.
+
+        Returns:
+            Tuple[List[str], Optional[Dict[str, str]]]: The PMIDs, and the `WebEnv`/`query_key`
+                parameters that let E-fetch reference the stored result set (None if not returned).
         """
         try:
             params = {
@@ -60,80 +151,60 @@ class PubMedHelper:
                 "term": query,
                 "retmode": "json",
                 "retmax": max_results,
-                "sort": "relevance"
+                "sort": "relevance",
+                "usehistory": "y"
             }
 
-            response = requests.get(self.e_search_url, params=params, timeout=10)
+            response = await self.http_client.get(self.e_search_url, params=params, timeout=10)
             response.raise_for_status()
 
-            data = response.json()
-            ids = data["esearchresult"]["idlist"]
-            self.logger.info(f"Found {len(ids)} PubMed articles for query: {query}")
-            return ids
-
-        except requests.RequestException as e:
-            self.logger.error(f"Error searching PubMed: {e}")
-            return []
+            data = orjson.loads(response.content)["esearchresult"]
+            ids = data["idlist"]
+            self.logger.info("Found %d PubMed articles for query: %s", len(ids), query)
+            history = None
+            if data.get("webenv") and data.get("querykey"):
+                history = {"WebEnv": data["webenv"], "query_key": data["querykey"]}
+            return ids, history
+
+        except httpx.HTTPError as e:
+            self.logger.error("Error searching PubMed: %s", e)
+            return [], None
         except KeyError as e:
-            self.logger.error(f"Unexpected response format from PubMed: {e}")
-            return []
+            self.logger.error("Unexpected response format from PubMed: %s", e)
+            return [], None
 
-    async def fetch_article_abstracts(self, xml_string: str) -> List[PubMedResult]:
+    async def _stream_article_abstracts(self, params: Dict[str, object]) -> List[PubMedResult]:
         """
-        Parses an XML string response from PubMed E-fetch API into structured PubMedResult objects.
+        Runs E-fetch and parses the XML incrementally as it is received.
 
-        This method extracts the Article Title, PMID (for URL construction), Journal Title,
-        and combines all AbstractText sections into a single snippet for each article found in the XML.
+        Each <PubmedArticle> is converted as soon as its closing tag arrives and then cleared, so
+        neither the whole response body nor the full element tree is held in memory at once.
 
         Args:
-            xml_string (str): The XML response content from the NCBI E-fetch API.
+            params (Dict[str, object]): The E-fetch query parameters.
 
         Returns:
-            List[PubMedResult]: A list of structured PubMed article data.
+            List[PubMedResult]: The parsed articles; those parsed before a malformed chunk are kept.
+
+        Raises:
+            httpx.HTTPError: If the request fails or returns an error status.
         """
         parsed_articles: List[PubMedResult] = []
-
-        try:
-            # Parse the XML string
-            root = ET.fromstring(xml_string)
-
-            for pubmed_article in root.findall('PubmedArticle'):
-                pmid_element = pubmed_article.find('.//MedlineCitation/PMID')
-                pmid = pmid_element.text if pmid_element is not None else 'N/A'
-
-                article_title_element = pubmed_article.find('.//Article/ArticleTitle')
-                title = article_title_element.text if article_title_element is not None else 'N/A'
-
-                abstract_texts = []
-                for abs_text_elem in pubmed_article.findall('.//Abstract/AbstractText'):
-                    if abs_text_elem.text:
-                        label = abs_text_elem.get('Label')
-                        text_content = abs_text_elem.text.strip()
-                        if label and text_content:
-                            abstract_texts.append(f"**{label.capitalize()}**: {text_content}")  # Example: Bold label
-                        elif text_content:
-                            abstract_texts.append(text_content)
-                snippet = "\n\n".join(abstract_texts).strip() if abstract_texts else 'No abstract available.'
-
-                journal_title_element = pubmed_article.find('.//Journal/Title')
-                journal_title = journal_title_element.text if journal_title_element is not None else 'PubMed Journal'
-
-                article_url = f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/" if pmid != 'N/A' else 'N/A'
-
-                if title != 'N/A' and article_url != 'N/A' and pmid != 'N/A':
-                    parsed_articles.append(PubMedResult(
-                        title=title,
-                        url=article_url,
-                        snippet=snippet,
-                        source=journal_title
-                    ))
-        except ET.ParseError as e:
-            self.logger.error(f"Error parsing PubMed XML: {e}")
-            return []
-        except Exception as e:
-            self.logger.error(f"Unexpected error during PubMed XML parsing: {e}")
-            return []
-
+        parser = ET.XMLPullParser(events=("end",))
+        async with self.http_client.stream("GET", self.e_fetch_url, params=params, timeout=20) as response:
+            response.raise_for_status()
+            try:
+                async for chunk in response.aiter_bytes():
+                    parser.feed(chunk)
+                    for _, element in parser.read_events():
+                        if element.tag == "PubmedArticle":
+                            article = _parse_article(element)
+                            if article is not None:
+                                parsed_articles.append(article)
+                            element.clear()
+                parser.close()
+            except ET.ParseError as e:
+                self.logger.error("Error parsing PubMed XML: %s", e)
         return parsed_articles
 
     async def search_and_fetch(self, query: str, max_results: int = 5) -> SearchResult:
@@ -143,58 +214,82 @@ class PubMedHelper:
         This method first searches PubMed for article IDs, then fetches their full XML data,
         parses it into a list of structured PubMedResult objects, and finally converts this
         list into a JSON string suitable for direct consumption by the frontend and LLM Agents.
+        E-fetch references the E-search result set on the NCBI history server and its XML is parsed
+        while it streams in (see `_stream_article_abstracts`); results are
+        cached per (query, max_results) for `PUBMED_CACHE_TTL_SECONDS`. Concurrent calls for the
+        same (query, max_results) share a single search.
 
         Args:
             query (str): Search query string
-            max_results (int): Maximum number of articles to retrieve
+            max_results (int): Maximum number of articles to retrieve, capped at `PUBMED_MAX_RESULTS`
 
         Returns:
             str: A JSON string representing a list of PubMedResult objects.
                  Returns an empty JSON array string if no articles are found or an error occurs.
 
         Raises:
-            requests.RequestException: If the API request fails during search or fetch
+            httpx.HTTPError: If the API request fails during search or fetch
             Exception: If there is an unexpected error during XML parsing or article processing
         """
-        article_ids = await self.get_article_ids(query, max_results)
+        max_results = min(max_results, PUBMED_MAX_RESULTS)
+        cache_key = (query, max_results)
+        cached = self._results.get(cache_key)
+        if cached is not None:
+            expires_at, result = cached
+            if time.monotonic() < expires_at:
+                self._results.move_to_end(cache_key)
+                self.logger.info("PubMed cache hit for query: %s", query)
+                return result
+            del self._results[cache_key]
+
+        # Concurrent identical searches share one E-search/E-fetch round trip.
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            self.logger.info("Joining in-flight PubMed search for query: %s", query)
+            return await asyncio.shield(inflight)
+        task = asyncio.ensure_future(self._fetch(query, max_results, cache_key))
+        self._inflight[cache_key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, query: str, max_results: int, cache_key: Tuple[str, int]) -> SearchResult:
+        """
+        Runs E-search and E-fetch for a search that is not cached and stores successful results.
+        """
+        article_ids, history = await self._search(query, max_results)
         if not article_ids:
-            return SearchResult(
-                search_results="No articles found for the given query.",
-                sources_urls=[]
-            )
+            return _NO_ARTICLES_RESULT
 
         try:
             params = {
                 "db": "pubmed",
-                "id": ",".join(article_ids),
                 "retmode": "xml",
                 "rettype": "abstract"
             }
+            if history:
+                # Reference the result set stored by E-search instead of resending the id list.
+                params.update(history, retmax=max_results)
+            else:
+                params["id"] = ",".join(article_ids)
 
-            response = requests.get(self.e_fetch_url, params=params, timeout=20)  # Increased timeout slightly
-            response.raise_for_status()
-
-            xml_string = response.text
-
-            parsed_articles = await self.fetch_article_abstracts(xml_string)
+            parsed_articles = await self._stream_article_abstracts(params)
 
-            self.logger.info(f"Successfully fetched and parsed PubMed XML for {len(parsed_articles)} articles")
+            self.logger.info("Successfully fetched and parsed PubMed XML for %d articles", len(parsed_articles))
 
-            data = json.dumps([article.model_dump() for article in parsed_articles])
-            return SearchResult(
+            data = _ARTICLES_ADAPTER.dump_json(parsed_articles).decode()
+            result = SearchResult.model_construct(
                 search_results=data,
                 sources_urls=[article.url for article in parsed_articles]
             )
-
-        except requests.RequestException as e:
-            self.logger.error(f"Error fetching PubMed XML: {e}")
-            return SearchResult(
-                search_results="Error fetching PubMed articles. Please try again later.",
-                sources_urls=[]
-            )
+            if parsed_articles:
+                self._results[cache_key] = (time.monotonic() + PUBMED_CACHE_TTL_SECONDS, result)
+                if len(self._results) > PUBMED_CACHE_SIZE:
+                    self._results.popitem(last=False)
+            return result
+
+        except httpx.HTTPError as e:
+            self.logger.error("Error fetching PubMed XML: %s", e)
+            return _FETCH_ERROR_RESULT
         except Exception as e:
-            self.logger.error(f"Unexpected error in PubMed XML processing or article parsing: {e}")
-            return SearchResult(
-                search_results="An unexpected error occurred while processing PubMed articles.",
-                sources_urls=[]
-            )
\ No newline at end of file
+            self.logger.error("Unexpected error in PubMed XML processing or article parsing: %s", e)
+            return _UNEXPECTED_ERROR_RESULT
\ No newline at end of file
@@ -1,10 +1,10 @@
 import asyncio
+import functools
 import os
+import sys
 from typing import List, Dict
 import logging
 
-from fastapi import FastAPI
-
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import (
@@ -13,15 +13,23 @@ from mcp.types import (
     ToolAnnotations
 )
 
-from web_search_helper import WebSearchHelper
-from pubmed_helper import PubMedHelper
+# Run as a script by the MCP client, the repository root is not on sys.path; the helpers
+# share the LLM providers' retry policy from `llm_agents`.
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _REPO_ROOT not in sys.path:
+    sys.path.append(_REPO_ROOT)
 
-fastApi = FastAPI()
+try:
+    from web_search_helper import SERPAPI_CLIENT, WebSearchHelper
+    from pubmed_helper import NCBI_CLIENT, PubMedHelper
+except ImportError:
+    # Imported as a package module by the in-process client mode rather than run as a script.
+    from .web_search_helper import SERPAPI_CLIENT, WebSearchHelper
+    from .pubmed_helper import NCBI_CLIENT, PubMedHelper
 
 app = Server("mcp-pubmed")
 
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 if os.environ.get("ENV") != "production":
@@ -31,6 +39,62 @@ if os.environ.get("ENV") != "production":
 pubmed_helper = PubMedHelper()
 
 
+@functools.cache
+def _get_web_search_helper() -> WebSearchHelper:
+    """
+    Returns the shared WebSearchHelper, created on first use so a missing SerpAPI key only fails web searches.
+    """
+    return WebSearchHelper(api_key=os.environ.get("SERP_API_KEY"))
+
+
+# The tool definitions are static, so they are built once rather than on every list_tools request.
+_TOOLS: List[Tool] = [
+    Tool(
+        name="search_pubmed",
+        description="Search PubMed literature database and return structured results.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "The search query string (e.g., 'What causes migraines?')"
+                },
+                "max_results": {
+                    "type": "integer",
+                    "default": 5,
+                    "description": "Maximum number of articles to retrieve (default: 5, max recommended: 10)"
+                }
+            },
+            "required": ["query"]
+        },
+        annotations=ToolAnnotations(
+            title="Search PubMed literature database",
+            readOnlyHint=True,
+            openWorldHint=True
+        )
+    ),
+    Tool(
+        name="web_search",
+        description="Perform a web search using the SERPAPI.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "The search query string (e.g., 'What is the treatment for diabetes?')"
+                }
+            },
+            "required": ["query"]
+        },
+        annotations=ToolAnnotations(
+            title="Web Search",
+            readOnlyHint=True,
+            openWorldHint=True
+        )
+    )
+]
+
+
 @app.list_tools()
 async def handle_list_tools() -> List[Tool]:
     """
@@ -40,51 +104,7 @@ async def handle_list_tools() -> List[Tool]:
         List[Tool]: List of available tools with their descriptions and schemas
     """
 
-    return [
-        Tool(
-            name="search_pubmed",
-            description="Search PubMed literature database and return structured results.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "The search query string (e.g., 'What causes migraines?')"
-                    },
-                    "max_results": {
-                        "type": "integer",
-                        "default": 5,
-                        "description": "Maximum number of articles to retrieve (default: 5, max recommended: 10)"
-                    }
-                },
-                "required": ["query"]
-            },
-            annotations=ToolAnnotations(
-                title="Search PubMed literature database",
-                readOnlyHint=True,
-                openWorldHint=True
-            )
-        ),
-        Tool(
-            name="web_search",
-            description="Perform a web search using the SERPAPI.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "The search query string (e.g., 'What is the treatment for diabetes?')"
-                    }
-                },
-                "required": ["query"]
-            },
-            annotations=ToolAnnotations(
-                title="Web Search",
-                readOnlyHint=True,
-                openWorldHint=True
-            )
-        )
-    ]
+    return _TOOLS
 
 
 @app.call_tool()
@@ -133,19 +153,19 @@ async def search_pubmed_literature(arguments: Dict) -> List[TextContent]:
             text="Error: Search query cannot be empty.",
             type="text"
         )]
-    logger.info(f"Starting PubMed search for query: '{query}' (max_results: {max_results})")
+    logger.info("Starting PubMed search for query: '%s' (max_results: %s)", query, max_results)
 
     try:
         article_data = await pubmed_helper.search_and_fetch(query, max_results)
 
         if not article_data.sources_urls:
-            logger.warning(f"No PubMed articles found for query: {query}")
+            logger.warning("No PubMed articles found for query: %s", query)
             return [TextContent(
                 type="text",
                 text=f"No PubMed articles found for the search query: '{query}'. Try using different or more general search terms."
             )]
 
-        logger.info(f"Successfully completed PubMed search. Found {len(article_data.sources_urls)} articles.")
+        logger.info("Successfully completed PubMed search. Found %d articles.", len(article_data.sources_urls))
 
         return [TextContent(
             type="text",
@@ -154,7 +174,7 @@ async def search_pubmed_literature(arguments: Dict) -> List[TextContent]:
 
 
     except Exception as e:
-        logger.error(f"Unexpected error in PubMed search: {e}")
+        logger.error("Unexpected error in PubMed search: %s", e)
         return [TextContent(
             type="text",
             text=f"An error occurred while searching PubMed: {str(e)}"
@@ -179,11 +199,10 @@ async def web_search(arguments: Dict) -> List[TextContent]:
             type="text"
         )]
 
-    logger.info(f"Starting web search for query: '{query}'")
-    web_search_helper = WebSearchHelper(api_key=os.environ.get("SERP_API_KEY"))
-    data = await web_search_helper.search_and_format_results(query)
+    logger.info("Starting web search for query: '%s'", query)
+    data = await _get_web_search_helper().search_and_format_results(query)
     if not data.search_results:
-        logger.warning(f"No web search results found for query: {query}")
+        logger.warning("No web search results found for query: %s", query)
         return [TextContent(
             type="text",
             text=f"No web search results found for the query: '{query}'. Try using different or more general search terms."
@@ -193,23 +212,55 @@ async def web_search(arguments: Dict) -> List[TextContent]:
         text=data.search_results
     )]
 
+# Hosts whose connections are opened at startup, before the first tool call needs them.
+_WARMUP_URLS = ((SERPAPI_CLIENT, "https://serpapi.com/"), (NCBI_CLIENT, "https://eutils.ncbi.nlm.nih.gov/"))
+
+
+async def warmup_connections() -> None:
+    """
+    Opens pooled connections to SerpAPI and NCBI so the first searches skip DNS, TCP and TLS setup.
+
+    Failures are logged and otherwise ignored; the tools connect on demand as before.
+    """
+    results = await asyncio.gather(
+        *(client.head(url, timeout=5) for client, url in _WARMUP_URLS), return_exceptions=True
+    )
+    for (_, url), result in zip(_WARMUP_URLS, results):
+        if isinstance(result, Exception):
+            logger.warning("Warm-up of %s failed: %s", url, result)
+
+
 async def main():
     """
     Main entry point to start the MCP server.
 
     This function initializes the MCP server and starts listening for requests.
-    It also sets up the necessary logging configuration.
+    It also sets up the necessary logging configuration. Connections to the search
+    backends are warmed up in the background while the MCP handshake proceeds.
     """
     logger.info("Starting MCP PubMed Server...")
-    async with stdio_server() as streams:
-        # Initialize the MCP server
-        await app.run(
-            streams[0],  # Input stream
-            streams[1],  # Output stream
-            app.create_initialization_options()
-        )
+    warmup = asyncio.create_task(warmup_connections())
+    try:
+        async with stdio_server() as streams:
+            # Initialize the MCP server
+            await app.run(
+                streams[0],  # Input stream
+                streams[1],  # Output stream
+                app.create_initialization_options()
+            )
+    finally:
+        warmup.cancel()
+        await asyncio.gather(NCBI_CLIENT.aclose(), SERPAPI_CLIENT.aclose())
     logger.info("MCP PubMed Server is running.")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # Configured only when run as the server process, not when imported by the in-process client mode.
+    logging.basicConfig(level=logging.INFO)
+    try:
+        import uvloop
+    except ImportError:
+        # uvloop is unavailable on Windows; fall back to the default event loop.
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -1,11 +1,17 @@
+import asyncio
 import os
 import logging
-import json
-from typing import Optional
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
 
-import requests
+import httpx
+import orjson
 from pydantic import BaseModel
 
+from llm_agents.llm_retry import llm_retrying
+
 if os.environ.get("ENV") != "production":
     from dotenv import load_dotenv
 
@@ -13,9 +19,46 @@ if os.environ.get("ENV") != "production":
 
 URL = "https://serpapi.com/search"
 
-logging.basicConfig(level=logging.INFO)
+# Keep-alive connection pool to SerpAPI shared by every WebSearchHelper, so searches skip the
+# TCP and TLS handshakes and do not block the MCP server's event loop.
+SERPAPI_CLIENT = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=20, keepalive_expiry=60),
+    timeout=httpx.Timeout(20.0, connect=10.0),
+    http2=True,
+)
+
 logger = logging.getLogger(__name__)
 
+# Upper bound on concurrent SerpAPI requests, so bursts queue here instead of failing on
+# the connection pool or tripping SerpAPI's rate limits.
+SERPAPI_CONCURRENCY = int(os.environ.get("SERP_CONCURRENCY", "16"))
+_SERPAPI_SEMAPHORE = asyncio.Semaphore(SERPAPI_CONCURRENCY)
+# Attempts per search, including the first, for connection errors, 429 and 5xx responses.
+SERPAPI_ATTEMPTS = 4
+
+# Size and lifetime of the process-wide cache of web search results (SerpAPI requests are billed).
+SERPAPI_CACHE_SIZE = 512
+SERPAPI_CACHE_TTL_SECONDS = 3600
+# Set DISABLE_SEARCH_CACHE=true to send every web search to SerpAPI.
+SEARCH_CACHE_DISABLED = os.environ.get("DISABLE_SEARCH_CACHE") == "true"
+_SEARCH_CACHE: "OrderedDict[str, Tuple[float, SearchResult]]" = OrderedDict()
+_INFLIGHT: Dict[str, "asyncio.Future[SearchResult]"] = {}
+
+
+def clear_search_cache() -> None:
+    """Removes every cached web search result."""
+    _SEARCH_CACHE.clear()
+
+
+def _is_transient_error(error: BaseException) -> bool:
+    """
+    Returns True for SerpAPI failures worth retrying: connection errors, timeouts, 429 and 5xx.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        status_code = error.response.status_code
+        return status_code == 429 or status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
 
 class SearchResult(BaseModel):
     """
@@ -37,10 +80,18 @@ class WebSearchHelper:
     that can be consumed by LLM agents.
     """
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, http_client: httpx.AsyncClient = SERPAPI_CLIENT):
+        self.http_client = http_client
         self.serpapi_key = api_key or os.environ.get("SERP_API_KEY")
         if not self.serpapi_key:
             raise ValueError("SerpAPI key must be provided.")
+        # Parameters shared by every search; only the query is added per call.
+        self._base_params = {
+            "api_key": self.serpapi_key,
+            "engine": "google",
+            "num": 5,
+            "safe": "active",
+        }
         logger.info("Initialized WebSearchHelper with SerpAPI key.")
 
     async def search_and_format_results(self, query: str) -> SearchResult:
@@ -49,7 +100,9 @@ class WebSearchHelper:
 
         This asynchronous function constructs the request parameters, including the
         search query, API key, desired engine, number of results, and safe search settings.
-        It then executes the request and parses the JSON response.
+        It then executes the request and parses the JSON response. Results with at least one
+        source are cached per normalized query for `SERPAPI_CACHE_TTL_SECONDS` (unless
+        `DISABLE_SEARCH_CACHE=true`), and concurrent identical searches share a single request.
 
         Args:
             query (str): The search query string.
@@ -59,37 +112,77 @@ class WebSearchHelper:
                           and metadata, structured for easy consumption by LLM agents.
 
         Raises:
+            httpx.HTTPError: If SerpAPI is still unreachable, rate-limiting or failing
+                             after `SERPAPI_ATTEMPTS` attempts.
             Exception: If the HTTP response status code is not 200 or if an error
                        message is returned by the SerpAPI.
         """
-        params = {
-            'q': query,
-            "api_key": self.serpapi_key,
-            "engine": "google",
-            "num": 5,
-            "safe": "active",
-        }
+        if SEARCH_CACHE_DISABLED:
+            return await self._search(query)
+
+        # Case and whitespace do not change the search, so they do not split cache entries.
+        cache_key = " ".join(query.lower().split())
+        cached = _SEARCH_CACHE.get(cache_key)
+        if cached is not None:
+            expires_at, result = cached
+            if time.monotonic() < expires_at:
+                _SEARCH_CACHE.move_to_end(cache_key)
+                logger.info("Web search cache hit for query: %s", query)
+                return result
+            del _SEARCH_CACHE[cache_key]
+
+        # Concurrent identical searches share one SerpAPI request.
+        inflight = _INFLIGHT.get(cache_key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+        task = asyncio.ensure_future(self._search(query))
+        _INFLIGHT[cache_key] = task
+        task.add_done_callback(lambda _: _INFLIGHT.pop(cache_key, None))
+        result = await asyncio.shield(task)
+        if result.sources_urls:
+            _SEARCH_CACHE[cache_key] = (time.monotonic() + SERPAPI_CACHE_TTL_SECONDS, result)
+            if len(_SEARCH_CACHE) > SERPAPI_CACHE_SIZE:
+                _SEARCH_CACHE.popitem(last=False)
+        return result
+
+    async def _search(self, query: str) -> SearchResult:
+        """
+        Sends the SerpAPI request for a search that is not cached.
 
-        response = requests.get(URL, params=params)
-        data = response.json()
+        At most `SERPAPI_CONCURRENCY` requests are in flight at once; transient failures are
+        retried with backoff while holding the slot.
+        """
+        params = {"q": query, **self._base_params}
+
+        async with _SERPAPI_SEMAPHORE:
+            async for attempt in llm_retrying(_is_transient_error, attempts=SERPAPI_ATTEMPTS, min_wait=0.25, max_wait=8):
+                with attempt:
+                    response = await self.http_client.get(URL, params=params)
+                    if response.status_code == 429 or response.status_code >= 500:
+                        response.raise_for_status()
+        data = orjson.loads(response.content)
         if response.status_code != 200:
             raise Exception(f"Error fetching data from SerpAPI: {data.get('error', 'Unknown error')}")
-        results = []
-
-        for i, result in enumerate(data.get("organic_results", []), 1):
-            title = result.get("title", "")
-            url = result.get("link", "")
-            snippet = result.get("snippet", "")
-            source = result.get("source", "")
-
+        # One result per domain: further snippets from the same site mostly repeat it and only
+        # add prompt tokens downstream. Results without a title or link are dropped.
+        results, sources_urls, seen_domains = [], [], set()
+        for result in data.get("organic_results", ()):
+            url, title = result.get("link"), result.get("title")
+            if not url or not title:
+                continue
+            domain = urlsplit(url).netloc
+            if domain in seen_domains:
+                continue
+            seen_domains.add(domain)
             results.append({
                 "title": title,
                 "url": url,
-                "snippet": snippet,
-                "source": source
+                "snippet": result.get("snippet", ""),
+                "source": result.get("source", "")
             })
+            sources_urls.append(url)
 
-        return SearchResult(
-            search_results=json.dumps(results),
-            sources_urls=[result.get("link", "") for result in data.get("organic_results", [])],
+        return SearchResult.model_construct(
+            search_results=orjson.dumps(results).decode(),
+            sources_urls=sources_urls,
         )
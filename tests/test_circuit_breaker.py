@@ -0,0 +1,87 @@
+import pytest
+
+from llm_agents.circuit_breaker import CircuitBreaker
+from llm_agents.llm_controller import _record_error
+from llm_agents.llm_provider import LLMProvider
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("llm_agents.circuit_breaker.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_opens_only_at_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert not breaker.is_open()
+
+    breaker.record_failure()
+    assert breaker.is_open()
+
+
+def test_half_open_lets_one_probe_through_and_recovers(clock):
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.is_open()
+
+    clock[0] += 5
+    assert not breaker.is_open()
+    assert breaker.is_open()
+
+    breaker.record_success()
+    assert not breaker.is_open()
+    assert not breaker.is_open()
+
+
+def test_failed_probe_reopens_for_longer(clock):
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_failure()
+
+    clock[0] += 5
+    assert not breaker.is_open()
+    breaker.record_failure()
+    clock[0] += 5
+    assert breaker.is_open()
+
+    clock[0] += 4
+    assert not breaker.is_open()
+
+
+def test_stale_probe_is_replaced(clock):
+    breaker = CircuitBreaker(failure_threshold=1, probe_timeout=30)
+    breaker.record_failure()
+
+    clock[0] += 5
+    assert not breaker.is_open()
+    clock[0] += 10
+    assert breaker.is_open()
+    clock[0] += 30
+    assert not breaker.is_open()
+
+
+class FakeLLM:
+    def __init__(self, transient):
+        self.transient = transient
+
+    def get_provider(self):
+        return LLMProvider.GEMINI
+
+    def is_transient_error(self, error):
+        return self.transient
+
+
+def test_record_error_counts_only_transient_errors(clock, monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=2)
+    monkeypatch.setattr("llm_agents.llm_controller.breaker_for", lambda provider: breaker)
+    breaker.record_failure()
+
+    _record_error(FakeLLM(transient=False), ValueError("bad request"))
+    assert breaker._consecutive_failures == 1
+
+    _record_error(FakeLLM(transient=True), TimeoutError())
+    assert breaker.is_open()
@@ -0,0 +1,93 @@
+import asyncio
+
+from llm_agents.llm_cache import ExactLLMCache
+
+
+def test_get_drops_expired_entries(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr("llm_agents.llm_cache.time.monotonic", lambda: now)
+    cache = ExactLLMCache(ttl=10)
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+
+    now = 111.0
+    assert cache.get("key") is None
+    assert "key" not in cache._entries
+
+
+def test_set_evicts_least_recently_used():
+    cache = ExactLLMCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_key_for_skips_sampling_requests_when_deterministic_only():
+    cache = ExactLLMCache(deterministic_only=True)
+    messages = [{"role": "user", "content": "hi"}]
+
+    assert cache.key_for("model", messages, 0.7, 100) is None
+    assert cache.key_for("model", messages, 0, 100) == cache.key_for("model", messages, 0, 100)
+
+
+def test_coalesce_shares_one_fetch():
+    async def scenario():
+        cache = ExactLLMCache()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*(cache.coalesce("key", fetch) for _ in range(3)))
+        return results, calls
+
+    results, calls = asyncio.run(scenario())
+    assert results == ["value"] * 3
+    assert calls == 1
+
+
+def test_coalesce_follower_survives_cancelled_leader():
+    async def scenario():
+        cache = ExactLLMCache()
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "value"
+
+        leader = asyncio.create_task(cache.coalesce("key", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.coalesce("key", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return leader, await follower
+
+    leader, value = asyncio.run(scenario())
+    assert leader.cancelled()
+    assert value == "value"
+
+
+def test_coalesce_propagates_errors_and_clears_inflight():
+    async def scenario():
+        cache = ExactLLMCache()
+
+        async def fetch():
+            raise ValueError("boom")
+
+        results = await asyncio.gather(cache.coalesce("key", fetch), cache.coalesce("key", fetch),
+                                       return_exceptions=True)
+        return cache, results
+
+    cache, results = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert cache._inflight == {}
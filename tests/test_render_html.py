@@ -0,0 +1,24 @@
+from llm_agents.multi_llm_controller import _render_html
+
+
+def test_escapes_markup_in_headings_and_items():
+    page = _render_html("## Risks <img src=x>\n- <script>alert(1)</script>")
+
+    assert "<script>" not in page
+    assert "&lt;script&gt;alert(1)&lt;/script&gt;" in page
+    assert "Risks &lt;img src=x&gt;</h2>" in page
+
+
+def test_renders_bold_without_escaping_the_tag():
+    page = _render_html("**Treatment:**\n1. Take **rest** & fluids")
+
+    assert "Treatment</h2>" in page
+    assert "<li>Take <strong>rest</strong> &amp; fluids</li>" in page
+
+
+def test_lines_before_any_heading_go_to_overview():
+    page = _render_html("```html\nPlain line\n```")
+
+    assert "Overview</h2>" in page
+    assert "<li>Plain line</li>" in page
+    assert "```" not in page
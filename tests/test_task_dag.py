@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from llm_agents.llm_controller import LLMRole
+from llm_agents.llm_provider import LLMProvider, LLMResponse
+from llm_agents.task_dag import TaskDAG, TaskNode
+
+
+class FakeAgent:
+    def __init__(self, role, events, delays=None, fail=()):
+        self.system_prompts = {role: "system"}
+        self.events = events
+        self.delays = delays or {}
+        self.fail = fail
+
+    async def execute_task(self, task, on_token=None):
+        self.events.append(("start", task.task_id))
+        try:
+            await asyncio.sleep(self.delays.get(task.task_id, 0))
+        except asyncio.CancelledError:
+            self.events.append(("cancelled", task.task_id))
+            raise
+        if task.task_id in self.fail:
+            raise RuntimeError(f"{task.task_id} failed")
+        self.events.append(("end", task.task_id))
+        return LLMResponse(content=task.prompt, provider=LLMProvider.GEMINI, model="fake")
+
+
+def _agents(events, **kwargs):
+    return {role: FakeAgent(role, events, **kwargs) for role in LLMRole}
+
+
+def test_run_respects_dependencies():
+    events = []
+    dag = TaskDAG(_agents(events, delays={"a": 0.02, "b": 0.01}))
+    nodes = [
+        TaskNode("c", ["a", "b"], lambda r: r["a"].content + r["b"].content, LLMRole.VALIDATOR),
+        TaskNode("a", [], lambda _: "A", LLMRole.RESEARCHER),
+        TaskNode("b", [], lambda _: "B", LLMRole.RESEARCHER),
+    ]
+
+    results = asyncio.run(dag.run(nodes))
+
+    assert results["c"].content == "AB"
+    assert events.index(("start", "c")) > events.index(("end", "a"))
+    assert events.index(("start", "c")) > events.index(("end", "b"))
+    assert events.index(("start", "b")) < events.index(("end", "a"))
+
+
+def test_run_cancels_running_nodes_on_error():
+    events = []
+    dag = TaskDAG(_agents(events, delays={"slow": 1}, fail={"bad"}))
+    nodes = [
+        TaskNode("slow", [], lambda _: "", LLMRole.RESEARCHER),
+        TaskNode("bad", [], lambda _: "", LLMRole.RESEARCHER),
+        TaskNode("after", ["bad"], lambda _: "", LLMRole.VALIDATOR),
+    ]
+
+    async def scenario():
+        with pytest.raises(RuntimeError, match="bad failed"):
+            await dag.run(nodes)
+        # Cancelled nodes have finished by the time run() raises.
+        assert ("cancelled", "slow") in events
+
+    asyncio.run(scenario())
+
+    assert ("start", "after") not in events
+
+
+def test_run_rejects_unknown_dependencies_and_cycles():
+    dag = TaskDAG(_agents([]))
+
+    with pytest.raises(ValueError, match="unknown"):
+        asyncio.run(dag.run([TaskNode("a", ["missing"], lambda _: "", LLMRole.RESEARCHER)]))
+    with pytest.raises(ValueError, match="acyclic"):
+        asyncio.run(dag.run([
+            TaskNode("a", ["b"], lambda _: "", LLMRole.RESEARCHER),
+            TaskNode("b", ["a"], lambda _: "", LLMRole.RESEARCHER),
+        ]))
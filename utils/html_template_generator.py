@@ -1,10 +1,77 @@
-class HTMLResponseGenerator:
-    def __init__(self):
-        self.disclaimer = """
+import functools
+from typing import Tuple
+
+from markupsafe import escape
+
+_DISCLAIMER = """
         <div class="bg-yellow-100 border-l-4 border-yellow-500 text-yellow-800 p-4 my-6 rounded-md text-sm">
             <strong class="text-red-600">⚠️ This information is for educational purposes only and should not be considered medical advice. Always consult a qualified healthcare professional for diagnosis and treatment.</strong>
         </div>
         """
+# Page skeleton around the sections; filled with `str.format_map`.
+_SHELL = """
+            <main class="max-w-3xl mx-auto p-6">
+                <section class="bg-white p-6 rounded-xl shadow-md">
+                    {disclaimer}
+                    <h1 class="text-3xl font-bold text-blue-800 mb-4">{title}</h1>
+                    {body}
+                    {disclaimer}
+                </section>
+            </main>
+        """
+_H2_OPEN = '<h2 class="text-xl font-bold text-blue-700 mt-8 mb-2 border-b-2 border-blue-200 pb-1">'
+_SECTION_OPEN = '<div class="bg-blue-50 border-l-4 border-blue-300 p-4 rounded-md mb-6">\n'
+_LIST_OPEN = '<ul class="list-disc list-inside space-y-1">\n'
+
+# Number of distinct rendered pages kept by `_render`.
+RENDER_CACHE_SIZE = 256
+
+
+def _sections_key(sections: dict) -> Tuple[Tuple[str, object], ...]:
+    """
+    Returns an HTML-escaped, hashable snapshot of `sections`.
+
+    Titles, list items and paragraphs are escaped unless they are `markupsafe.Markup`, which is
+    trusted as already safe. Lists become tuples, and content that is neither a list nor a string
+    (which renders an empty section) becomes None. Escaping happens here, before the `_render`
+    cache lookup, because a `Markup` value compares equal to the same plain string.
+    """
+    return tuple(
+        (
+            str(escape(title)),
+            tuple(str(escape(item)) for item in content) if isinstance(content, list)
+            else str(escape(content)) if isinstance(content, str) else None
+        )
+        for title, content in sections.items()
+    )
+
+
+def _render_sections(sections_key: Tuple[Tuple[str, object], ...]) -> str:
+    parts = []
+    append = parts.append
+    for title, content in sections_key:
+        append(f"{_H2_OPEN}{title}</h2>\n")
+        append(_SECTION_OPEN)
+        if isinstance(content, tuple):
+            append(_LIST_OPEN)
+            parts.extend(f"<li>{item}</li>\n" for item in content)
+            append("</ul>\n")
+        elif content is not None:
+            append(f"<p>{content}</p>\n")
+        append("</div>\n")
+    return "".join(parts)
+
+
+@functools.lru_cache(maxsize=RENDER_CACHE_SIZE)
+def _render(title: str, sections_key: Tuple[Tuple[str, object], ...]) -> str:
+    """Renders the full page; identical titles and sections are served from the cache."""
+    return _SHELL.format_map({"disclaimer": _DISCLAIMER, "title": title, "body": _render_sections(sections_key)})
+
+
+class HTMLResponseGenerator:
+    disclaimer = _DISCLAIMER
+
+    def __init__(self):
         self.title = "Medical Information"
         self.sections = {}
 
@@ -13,29 +80,8 @@ class HTMLResponseGenerator:
         self.title = title
 
     def _build_sections(self) -> str:
-        html = ""
-        for title, content in self.sections.items():
-            html += f'<h2 class="text-xl font-bold text-blue-700 mt-8 mb-2 border-b-2 border-blue-200 pb-1">{title}</h2>\n'
-            html += '<div class="bg-blue-50 border-l-4 border-blue-300 p-4 rounded-md mb-6">\n'
-            if isinstance(content, list):
-                html += '<ul class="list-disc list-inside space-y-1">\n'
-                for item in content:
-                    html += f"<li>{item}</li>\n"
-                html += "</ul>\n"
-            elif isinstance(content, str):
-                html += f"<p>{content}</p>\n"
-            html += "</div>\n"
-        return html
+        return _render_sections(_sections_key(self.sections))
 
     def generate_html(self) -> str:
         """Generate Tailwind-styled HTML output from internal state."""
-        return f"""
-            <main class="max-w-3xl mx-auto p-6">
-                <section class="bg-white p-6 rounded-xl shadow-md">
-                    {self.disclaimer}
-                    <h1 class="text-3xl font-bold text-blue-800 mb-4">{self.title}</h1>
-                    {self._build_sections()}
-                    {self.disclaimer}
-                </section>
-            </main>
-        """
+        return _render(str(escape(self.title)), _sections_key(self.sections))